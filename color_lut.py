@@ -0,0 +1,84 @@
+# 양자화 색상 조회 테이블(LUT) 기반 픽셀 분류기
+#
+# RGB 각 채널을 32단계로 양자화한 32x32x32 칸마다 피부/머리카락/배경 라벨을
+# 미리 계산해 color_lut.npy로 함께 배포한다. 분석할 때는 픽셀마다 색 공간 변환을
+# 하는 대신, 인덱스를 계산해 테이블을 한 번 조회하는 것으로 전체 이미지를 라벨링한다.
+#
+# 테이블 다시 만들기: python color_lut.py
+
+import os
+
+import cv2
+import numpy as np
+
+LUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'color_lut.npy')
+
+BITS = 5                 # 채널당 2^5 = 32단계
+LEVELS = 1 << BITS
+SHIFT = 8 - BITS
+
+BACKGROUND = 0
+SKIN = 1
+HAIR = 2
+
+def build_lut():
+    """
+    각 양자화 칸의 중심색을 규칙으로 분류해 테이블 생성
+
+    - 피부: YCrCb 공간의 고전적인 피부색 범위 (Cr 133~173, Cb 77~127, 너무 어둡지 않음)
+    - 머리카락: 피부가 아니면서 아주 어둡거나(검정/짙은 갈색),
+                채도가 낮지 않은 주황~노랑 계열(갈색/적발/금발)
+    - 그 외는 배경
+    반환: (32768,) uint8 배열 - 인덱스 (r << 10) | (g << 5) | b
+    """
+    centers = (np.arange(LEVELS) << SHIFT) + (1 << (SHIFT - 1))
+    r, g, b = np.meshgrid(centers, centers, centers, indexing='ij')
+    rgb = np.stack([r, g, b], axis=-1).reshape(1, -1, 3).astype(np.uint8)
+
+    ycrcb = cv2.cvtColor(rgb, cv2.COLOR_RGB2YCrCb)[0].astype(np.int32)
+    hsv = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)[0].astype(np.int32)
+    y, cr, cb = ycrcb[:, 0], ycrcb[:, 1], ycrcb[:, 2]
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+
+    skin = (cr >= 133) & (cr <= 173) & (cb >= 77) & (cb <= 127) & (y > 60)
+    dark = v < 70
+    # OpenCV 색상(H)은 0~179, 주황~노랑 = 약 5~35
+    warm = (h >= 5) & (h <= 35) & (s >= 50) & (v <= 230)
+    hair = ~skin & (dark | warm)
+
+    lut = np.full(LEVELS ** 3, BACKGROUND, dtype=np.uint8)
+    lut[skin] = SKIN
+    lut[hair] = HAIR
+    return lut
+
+_lut = None
+
+def load_lut():
+    """배포된 테이블을 memmap으로 한 번만 열어 재사용 (없으면 생성 후 저장)"""
+    global _lut
+    if _lut is None:
+        if not os.path.exists(LUT_PATH):
+            np.save(LUT_PATH, build_lut())
+        _lut = np.asarray(np.load(LUT_PATH, mmap_mode='r'))
+    return _lut
+
+# 채널별 인덱스 기여분 (r << 10, g << 5, b) - cv2.LUT로 세 채널을 한 번에 변환
+_levels = np.arange(256, dtype=np.uint16) >> SHIFT
+_CHANNEL_TABLE = np.stack(
+    [_levels << (2 * BITS), _levels << BITS, _levels], axis=-1
+).reshape(1, 256, 3)
+_CHANNEL_SUM = np.ones((1, 3))
+
+def label_pixels(rgb):
+    """
+    RGB uint8 이미지의 모든 픽셀을 한 번의 테이블 조회로 라벨링
+
+    반환: rgb와 같은 높이/너비의 uint8 라벨 배열 (BACKGROUND/SKIN/HAIR)
+    """
+    index = cv2.transform(cv2.LUT(np.ascontiguousarray(rgb), _CHANNEL_TABLE), _CHANNEL_SUM)
+    return np.take(load_lut(), index)
+
+if __name__ == '__main__':
+    np.save(LUT_PATH, build_lut())
+    lut = np.load(LUT_PATH)
+    print(f"{LUT_PATH}: 피부 {np.sum(lut == SKIN)}칸, 머리카락 {np.sum(lut == HAIR)}칸, 배경 {np.sum(lut == BACKGROUND)}칸")
@@ -0,0 +1,235 @@
+# 열(columnar) 형식 내보내기 - Arrow / Parquet
+#
+# 부부 일괄 예측 결과와 사진 분석 결과를 분석용 저장소로 넘기기 위한 writer.
+# 행마다 파이썬 딕셔너리를 JSON으로 쓰지 않고, 배치 단위로 NumPy 배열을 만들어
+# Arrow record batch로 감싼 뒤 Parquet(.parquet) 또는 Arrow IPC 파일(.arrow)로 쓴다.
+#
+# - 배치 안의 배열은 처음부터 (형질, 유전자형 코드, 행) 순서로 만들어 두므로
+#   열 하나가 연속된 1차원 메모리이고, Arrow 배열은 이를 복사 없이(zero-copy) 참조한다.
+# - 열 이름과 순서는 형질 목록(trait_registry 레지스트리) id 순서를 따른다.
+#   사진 분석 결과에는 자동 인식 형질만 있으므로, 사진 쪽은 레지스트리를 넘기면
+#   자동 인식 형질(registry.auto)로만 열을 만든다 (형질 목록을 직접 넘기면 그대로 사용).
+#     {trait_id}.user_code / .spouse_code   부모 유전자형 코드 (혼합이면 가장 가능성 높은 것)
+#     {trait_id}.user_p0~2 / .spouse_p0~2   부모 유전자형 코드 확률
+#     {trait_id}.child_p0~2                 자녀 코드 확률
+#     {trait_id}.code, {trait_id}.p0~2      사진 분석 유전자형 코드와 확률
+#   코드 순서의 유전자형 이름은 열 메타데이터 'genotypes'에 들어 있다.
+# - Parquet은 max_buffer_rows 행까지만 메모리에 모았다가 row group 하나로 쓴다.
+
+import json
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from genetics_engine import (
+    N_GENOTYPES, encode_genotype_probs, genotype_labels, offspring_tables, trait_ids
+)
+from photo_features import MEASUREMENT_NAMES
+
+DEFAULT_BATCH_ROWS = 65_536
+DEFAULT_BUFFER_ROWS = 1 << 20
+
+# ==========================================
+# 스키마
+# ==========================================
+
+def _genotype_fields(trait, prefix, with_code=True):
+    """형질 하나의 코드 열과 확률 열 정의"""
+    metadata = {'genotypes': ','.join(genotype_labels(trait))}
+    fields = []
+    if with_code:
+        fields.append(pa.field(f"{trait['id']}.{prefix}code", pa.int8(), nullable=False, metadata=metadata))
+    fields += [
+        pa.field(f"{trait['id']}.{prefix}p{k}", pa.float64(), nullable=False, metadata=metadata)
+        for k in range(N_GENOTYPES)
+    ]
+    return fields
+
+def prediction_schema(traits):
+    """부부 일괄 예측 결과 스키마 (couple_id + 형질별 부모 코드/확률, 자녀 확률)"""
+    fields = [pa.field('couple_id', pa.int64(), nullable=False)]
+    for trait in traits:
+        fields += _genotype_fields(trait, 'user_')
+        fields += _genotype_fields(trait, 'spouse_')
+        fields += _genotype_fields(trait, 'child_', with_code=False)
+    return pa.schema(fields, metadata={'trait_ids': json.dumps(list(trait_ids(traits)))})
+
+def photo_traits(traits):
+    """사진 분석 결과에 들어 있는 형질 목록 - 레지스트리면 자동 인식 형질만, 목록이면 그대로"""
+    return getattr(traits, 'auto', traits)
+
+def photo_schema(traits):
+    """
+    사진 분석 결과 스키마 (사진/얼굴 번호 + 측정값 + 형질별 코드/확률)
+
+    traits: 레지스트리면 자동 인식 형질만 열로 만든다 (photo_traits)
+    """
+    traits = photo_traits(traits)
+    fields = [
+        pa.field('photo_id', pa.string(), nullable=False),
+        pa.field('face', pa.int16(), nullable=False),
+    ]
+    fields += [pa.field(name, pa.float64(), nullable=False) for name in MEASUREMENT_NAMES]
+    for trait in traits:
+        fields += _genotype_fields(trait, '')
+    return pa.schema(fields, metadata={'trait_ids': json.dumps(list(trait_ids(traits)))})
+
+# ==========================================
+# record batch 만들기
+# ==========================================
+
+def _columns(probs):
+    """
+    (행 수, 형질 수, 3) 배열 -> (형질 수, 3, 행 수) 연속 배열
+
+    이후 [t, k] 한 줄이 열 하나가 되어 Arrow 배열이 복사 없이 참조한다.
+    """
+    return np.ascontiguousarray(np.moveaxis(probs, 0, -1))
+
+def _genotype_arrays(probs, codes, t):
+    """형질 t의 [코드, p0, p1, p2] Arrow 배열 (probs: (형질 수, 3, 행 수), codes: (형질 수, 행 수))"""
+    return [pa.array(codes[t])] + [pa.array(probs[t, k]) for k in range(N_GENOTYPES)]
+
+def _likely_codes(probs):
+    """가장 가능성 높은 유전자형 코드 (형질 수, 행 수) int8"""
+    return probs.argmax(axis=1).astype(np.int8)
+
+def prediction_batch(traits, user_rows, spouse_rows, start_id=0):
+    """
+    부부 여러 쌍의 자녀 분포를 계산해 record batch 하나로
+
+    user_rows, spouse_rows: 같은 길이의 {trait_id: 유전자형 또는 혼합} 목록
+    start_id: 첫 부부의 couple_id
+    """
+    ids = trait_ids(traits)
+    # (행, 형질, 3) -> (형질, 3, 행) 연속 배열로 한 번만 옮김
+    user = _columns(encode_genotype_probs(user_rows, ids))
+    spouse = _columns(encode_genotype_probs(spouse_rows, ids))
+    user_codes, spouse_codes = _likely_codes(user), _likely_codes(spouse)
+    # 자녀 분포는 einsum 출력 순서를 (형질, 자녀 코드, 행)으로 지정해 처음부터 열 단위로 계산
+    child = np.ascontiguousarray(np.einsum('tin,tjn,tijk->tkn', user, spouse, offspring_tables(traits)))
+
+    arrays = [pa.array(np.arange(start_id, start_id + len(user_rows), dtype=np.int64))]
+    for t in range(len(ids)):
+        arrays += _genotype_arrays(user, user_codes, t)
+        arrays += _genotype_arrays(spouse, spouse_codes, t)
+        arrays += [pa.array(child[t, k]) for k in range(N_GENOTYPES)]
+    return pa.RecordBatch.from_arrays(arrays, schema=prediction_schema(traits))
+
+def photo_batch(traits, analyses):
+    """
+    사진 분석 결과 목록을 record batch 하나로
+
+    analyses: [{'photo_id', 'face', 'features': {측정값 이름: 값},
+                'probs': {trait_id: 유전자형 또는 혼합}}, ...]
+              (photo_analysis.analyze_faces 결과에 photo_id, face를 붙인 것)
+    traits: 레지스트리면 자동 인식 형질만 열로 만든다 (photo_traits)
+    """
+    ids = trait_ids(photo_traits(traits))
+    features = np.array([[a['features'][name] for a in analyses] for name in MEASUREMENT_NAMES],
+                        dtype=np.float64).reshape(len(MEASUREMENT_NAMES), len(analyses))
+    probs = _columns(encode_genotype_probs([a['probs'] for a in analyses], ids))
+    codes = _likely_codes(probs)
+
+    arrays = [
+        pa.array([str(a['photo_id']) for a in analyses], type=pa.string()),
+        pa.array(np.array([a['face'] for a in analyses], dtype=np.int16)),
+    ]
+    arrays += [pa.array(features[f]) for f in range(len(MEASUREMENT_NAMES))]
+    for t in range(len(ids)):
+        arrays += _genotype_arrays(probs, codes, t)
+    return pa.RecordBatch.from_arrays(arrays, schema=photo_schema(traits))
+
+# ==========================================
+# 파일 쓰기
+# ==========================================
+
+class ColumnarWriter:
+    """
+    record batch를 Parquet(.parquet) 또는 Arrow IPC(.arrow) 파일에 이어 쓰는 writer
+
+    Parquet은 max_buffer_rows 행까지 모았다가 row group 하나로 쓰고,
+    Arrow IPC는 batch를 받는 즉시 쓴다. with 문으로 쓰면 끝날 때 남은 행을 쓰고 닫는다.
+    """
+
+    def __init__(self, path, schema, max_buffer_rows=DEFAULT_BUFFER_ROWS):
+        self.path = path
+        self.schema = schema
+        self.max_buffer_rows = max_buffer_rows
+        self.parquet = str(path).endswith('.parquet')
+        if self.parquet:
+            self._writer = pq.ParquetWriter(path, schema)
+        else:
+            self._writer = pa.ipc.new_file(path, schema)
+        self._buffer = []
+        self._buffered_rows = 0
+        self.rows_written = 0
+
+    def write(self, batch):
+        if not self.parquet:
+            self._writer.write_batch(batch)
+            self.rows_written += batch.num_rows
+            return
+        self._buffer.append(batch)
+        self._buffered_rows += batch.num_rows
+        if self._buffered_rows >= self.max_buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """모아 둔 batch를 row group으로 씀"""
+        if not self._buffer:
+            return
+        table = pa.Table.from_batches(self._buffer, schema=self.schema)
+        self._writer.write_table(table, row_group_size=table.num_rows)
+        self.rows_written += table.num_rows
+        self._buffer = []
+        self._buffered_rows = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def export_predictions(path, traits, couples, batch_rows=DEFAULT_BATCH_ROWS,
+                       max_buffer_rows=DEFAULT_BUFFER_ROWS):
+    """
+    (본인, 배우자) 데이터 쌍 iterable을 batch_rows쌍씩 예측해 파일로 내보냄
+
+    반환: 쓴 행 수
+    """
+    start_id = 0
+    with ColumnarWriter(path, prediction_schema(traits), max_buffer_rows) as writer:
+        for chunk in _chunks(couples, batch_rows):
+            user_rows, spouse_rows = zip(*chunk)
+            writer.write(prediction_batch(traits, user_rows, spouse_rows, start_id))
+            start_id += len(chunk)
+    return writer.rows_written
+
+def export_photo_features(path, traits, analyses, batch_rows=DEFAULT_BATCH_ROWS,
+                          max_buffer_rows=DEFAULT_BUFFER_ROWS):
+    """
+    사진 분석 결과 iterable을 batch_rows개씩 묶어 파일로 내보냄
+
+    traits: 레지스트리면 자동 인식 형질만 열로 만든다 (photo_traits)
+    반환: 쓴 행 수
+    """
+    with ColumnarWriter(path, photo_schema(traits), max_buffer_rows) as writer:
+        for chunk in _chunks(analyses, batch_rows):
+            writer.write(photo_batch(traits, chunk))
+    return writer.rows_written
@@ -0,0 +1,143 @@
+# 구조화된 이벤트 로그 (JSONL)
+#
+# 페이지 이동, 사진 분석 시간, 오류 같은 이벤트를 한 줄에 하나씩 JSON으로 남긴다.
+# Streamlit 스크립트 스레드는 크기가 정해진 메모리 큐에 넣기만 하고(가득 차면 버림),
+# 파일 쓰기와 크기 기준 회전은 백그라운드 스레드 하나가 모아서 처리한다.
+# 따라서 로그를 남겨도 rerun 지연 시간이 늘지 않는다.
+# Streamlit 앱은 log_session_event로 세션 id와 현재 페이지를 붙여 기록한다.
+#
+# 환경 변수:
+#   GENETICS_EVENT_LOG            로그 파일 경로 (빈 문자열이면 기록하지 않음)
+#   GENETICS_EVENT_LOG_MAX_BYTES  파일 하나의 최대 크기, 넘으면 .1, .2 ... 로 회전
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LOG_PATH = os.environ.get('GENETICS_EVENT_LOG', os.path.join(APP_DIR, 'logs', 'events.jsonl'))
+DEFAULT_MAX_BYTES = int(os.environ.get('GENETICS_EVENT_LOG_MAX_BYTES', 10 * 2**20))
+DEFAULT_BACKUPS = 5
+DEFAULT_QUEUE_SIZE = 10_000
+
+_STOP = object()
+
+class EventLog:
+    """bounded 큐 + 백그라운드 writer 스레드 방식의 JSONL 이벤트 로그"""
+
+    def __init__(self, path=DEFAULT_LOG_PATH, max_bytes=DEFAULT_MAX_BYTES,
+                 backups=DEFAULT_BACKUPS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.emitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def emit(self, event, **fields):
+        """이벤트 하나를 큐에 넣음 - 절대 기다리지 않고, 큐가 가득 차면 버리고 개수만 셈"""
+        if not self.enabled:
+            return
+        self._ensure_writer()
+        record = {'ts': round(time.time(), 3), 'event': event}
+        record.update(fields)
+        try:
+            self._queue.put_nowait(record)
+            self.emitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        """큐에 쌓인 이벤트를 묶어서 쓰고, 파일이 커지면 회전"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [record for record in batch if record is not _STOP]
+
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    for record in batch:
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                    size = f.tell()
+                self.written += len(batch)
+                if size >= self.max_bytes:
+                    self._rotate()
+            except OSError:
+                self.write_errors += 1
+
+    def _rotate(self):
+        """events.jsonl -> events.jsonl.1 -> ... -> events.jsonl.{backups} (가장 오래된 것은 삭제)"""
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self, timeout=2.0):
+        """남은 이벤트를 쓰고 writer 스레드 종료 (프로세스 종료 시 자동 호출)"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        """기록/버림 개수 등 로그 상태"""
+        return {
+            'emitted': self.emitted,
+            'dropped': self.dropped,
+            'written': self.written,
+            'pending': self._queue.qsize(),
+            'write_errors': self.write_errors,
+        }
+
+# 프로세스 전체에서 공유하는 이벤트 로그
+events = EventLog()
+
+def log_session_event(app, event, **fields):
+    """세션 id, 앱, 현재 페이지를 붙여 이벤트 기록 (큐에 넣기만 하므로 rerun을 늦추지 않음)"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    events.emit(
+        event,
+        app=app,
+        session=ctx.session_id if ctx is not None else None,
+        page=st.session_state.get('page') if ctx is not None else None,
+        **fields
+    )
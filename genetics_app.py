@@ -3,8 +3,22 @@
 # 설치: pip install streamlit
 # 실행: streamlit run genetics_app.py
 
+import time
+from functools import partial
+
 import streamlit as st
-from collections import Counter
+
+from event_log import log_session_event
+from genetics_engine import prediction_columns, sensitivity_matrix
+from incremental import IncrementalPredictor
+from prediction_cache import cached_predict
+from result_views import sensitivity_view, siblings_view
+from session_resume import resume_from_url, resume_sidebar, save_progress as save_session
+from trait_registry import load_registry
+from warm_start import WARM_START, start_warm_up
+
+APP_NAME = 'basic'
+rerun_started = time.perf_counter()
 
 # 페이지 설정
 st.set_page_config(
@@ -36,183 +50,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 형질 데이터
-traits_data = [
-    {
-        'id': 'hair_texture',
-        'name': '머리카락 모양',
-        'dominant': '곱슬머리',
-        'recessive': '직모',
-        'options': {
-            '곱슬머리 (가족 모두 곱슬)': 'DD',
-            '곱슬머리 (가족 중 직모도 있음)': 'Dd',
-            '직모': 'dd'
-        }
-    },
-    {
-        'id': 'hair_color',
-        'name': '머리카락 색',
-        'dominant': '검정/갈색',
-        'recessive': '금발/적발',
-        'options': {
-            '검정/갈색 (가족 모두 어두운 머리)': 'DD',
-            '검정/갈색 (가족 중 밝은 머리도 있음)': 'Dd',
-            '금발/적발': 'dd'
-        }
-    },
-    {
-        'id': 'dimples',
-        'name': '보조개',
-        'dominant': '있음',
-        'recessive': '없음',
-        'options': {
-            '보조개 있음 (가족 대부분 있음)': 'DD',
-            '보조개 있음 (가족 중 없는 사람도 있음)': 'Dd',
-            '보조개 없음': 'dd'
-        }
-    },
-    {
-        'id': 'widows_peak',
-        'name': 'M자 이마선',
-        'dominant': '있음',
-        'recessive': '없음',
-        'options': {
-            'M자 이마선 있음 (가족 대부분 있음)': 'DD',
-            'M자 이마선 있음 (가족 중 없는 사람도 있음)': 'Dd',
-            'M자 이마선 없음': 'dd'
-        }
-    },
-    {
-        'id': 'eyebrows',
-        'name': '눈썹 연결',
-        'dominant': '있음',
-        'recessive': '없음',
-        'options': {
-            '눈썹 연결됨': 'DD',
-            '눈썹 약간 연결됨': 'Dd',
-            '눈썹 분리됨': 'dd'
-        }
-    },
-    {
-        'id': 'freckles',
-        'name': '주근깨',
-        'dominant': '있음',
-        'recessive': '없음',
-        'options': {
-            '주근깨 많음': 'DD',
-            '주근깨 약간 있음': 'Dd',
-            '주근깨 없음': 'dd'
-        }
-    },
-    {
-        'id': 'eyelashes',
-        'name': '속눈썹 길이',
-        'dominant': '긴 속눈썹',
-        'recessive': '짧은 속눈썹',
-        'options': {
-            '긴 속눈썹': 'DD',
-            '중간 길이 속눈썹': 'Dd',
-            '짧은 속눈썹': 'dd'
-        }
-    },
-    {
-        'id': 'double_eyelid',
-        'name': '쌍꺼풀',
-        'dominant': '있음',
-        'recessive': '없음',
-        'options': {
-            '쌍꺼풀 있음 (진함)': 'DD',
-            '쌍꺼풀 있음 (약함)': 'Dd',
-            '쌍꺼풀 없음': 'dd'
-        }
-    },
-    {
-        'id': 'nose',
-        'name': '코 모양',
-        'dominant': '오똑한 코',
-        'recessive': '낮은 코',
-        'options': {
-            '오똑한 코': 'DD',
-            '중간 높이 코': 'Dd',
-            '낮은 코': 'dd'
-        }
-    },
-    {
-        'id': 'lips',
-        'name': '입술 두께',
-        'dominant': '두꺼운 입술',
-        'recessive': '얇은 입술',
-        'options': {
-            '두꺼운 입술': 'DD',
-            '중간 두께 입술': 'Dd',
-            '얇은 입술': 'dd'
-        }
-    },
-    {
-        'id': 'earlobe',
-        'name': '귓볼',
-        'dominant': '분리형',
-        'recessive': '부착형',
-        'options': {
-            '분리형 귓볼': 'DD',
-            '약간 분리된 귓볼': 'Dd',
-            '부착형 귓볼': 'dd'
-        }
-    },
-    {
-        'id': 'height',
-        'name': '키 (다인자 유전)',
-        'dominant': '큰 키',
-        'recessive': '작은 키',
-        'options': {
-            '매우 큼 (여 170cm 이상/남 180cm 이상)': 'tall',
-            '중간 (여 160-170cm/남 170-180cm)': 'medium',
-            '작음 (여 160cm 이하/남 170cm 이하)': 'short'
-        }
-    },
-    {
-        'id': 'skin',
-        'name': '피부색 (다인자 유전)',
-        'dominant': '어두운 피부',
-        'recessive': '밝은 피부',
-        'options': {
-            '어두운 피부': 'dark',
-            '중간 톤 피부': 'medium',
-            '밝은 피부': 'light'
-        }
-    }
-]
+# 형질 데이터 (traits.json에서 한 번 읽어 컴파일한 읽기 전용 레지스트리)
+traits_data = load_registry('basic')
 
-def punnett_square(g1, g2):
-    """Punnett Square를 이용한 자녀 유전자형 계산"""
-    # 다인자 유전 형질 처리
-    if g1 in ['tall', 'medium', 'short', 'dark', 'light']:
-        return predict_polygenic(g1, g2)
-    
-    # 단일 유전자 형질 처리
-    outcomes = []
-    for a1 in g1:
-        for a2 in g2:
-            genotype = ''.join(sorted([a1, a2], reverse=True))
-            outcomes.append(genotype)
-    return outcomes
-
-def predict_polygenic(p1, p2):
-    """다인자 유전 형질 예측"""
-    values = {'tall': 3, 'medium': 2, 'short': 1, 'dark': 3, 'light': 1}
-    avg = (values.get(p1, 2) + values.get(p2, 2)) / 2
-    
-    if avg >= 2.5:
-        return ['높음/어두움']
-    elif avg >= 1.5:
-        return ['중간']
-    return ['낮음/밝음']
+# 프로세스당 한 번 백그라운드에서 모델, 분석기 예열 (warm_start.py 참고)
+@st.cache_resource(show_spinner=False)
+def warm_start():
+    return start_warm_up(APP_NAME)
 
-def get_phenotype(genotype):
-    """유전자형에서 표현형 결정"""
-    if genotype in ['높음/어두움', '중간', '낮음/밝음']:
-        return genotype
-    return '우성 형질 표현' if 'D' in genotype else '열성 형질 표현'
+if WARM_START:
+    warm_start()
 
 # 세션 상태 초기화
 if 'page' not in st.session_state:
@@ -221,6 +68,103 @@ if 'user_data' not in st.session_state:
     st.session_state.user_data = {}
 if 'spouse_data' not in st.session_state:
     st.session_state.spouse_data = {}
+if 'predictor' not in st.session_state:
+    st.session_state.predictor = IncrementalPredictor()
+
+# 세션 id, 앱, 현재 페이지를 붙여 이벤트 기록 (event_log.log_session_event)
+log_event = partial(log_session_event, APP_NAME)
+
+# ==========================================
+# 세션 저장 / 이어하기
+# ==========================================
+
+def session_snapshot():
+    """저장할 세션 요약 - (사람별 유전자형, 나머지 상태)"""
+    people = {'user': st.session_state.user_data, 'spouse': st.session_state.spouse_data}
+    return people, {'page': st.session_state.page}
+
+def restore_session(people, state):
+    """이어하기로 불러온 진행 단계 복원 (본인/배우자 유전자형은 session_resume이 되돌림)"""
+    st.session_state.page = state.get('page', 'user')
+
+# 입력이 바뀌었을 때만 진행 상황 저장 (session_resume.save_progress)
+save_progress = partial(save_session, APP_NAME, traits_data, session_snapshot)
+
+# 주소에 이어하기 코드가 있으면 세션당 한 번 복원 (새로고침, 연결 끊김 후 돌아온 경우)
+resume_from_url(APP_NAME, traits_data, restore_session)
+
+# 페이지가 바뀐 첫 실행에서만 이동 이벤트 기록 (사용자 흐름 분석용)
+if st.session_state.get('logged_page') != st.session_state.page:
+    log_event('page_view', previous=st.session_state.get('logged_page'))
+    st.session_state.logged_page = st.session_state.page
+
+@st.fragment
+def trait_inputs(role):
+    """형질 선택 위젯 영역 - 선택이 바뀌면 페이지 전체가 아니라 이 영역만 다시 실행"""
+    data = st.session_state[f"{role}_data"]
+    
+    col1, col2 = st.columns(2)
+    
+    for i, trait in enumerate(traits_data):
+        col = col1 if i % 2 == 0 else col2
+        
+        with col:
+            with st.container():
+                st.subheader(f"🧬 {trait['name']}")
+                st.caption(f"우성: {trait['dominant']} / 열성: {trait['recessive']}")
+                
+                selected = st.selectbox(
+                    "선택하세요",
+                    options=trait['option_labels'],
+                    key=f"{role}_{trait['id']}",
+                    label_visibility="collapsed"
+                )
+                
+                # 유전자형 표시
+                genotype = trait['options'][selected]
+                st.caption(f"유전자형: `{genotype}`")
+                
+                data[trait['id']] = genotype
+                st.markdown("---")
+    
+    save_progress()
+
+@st.fragment
+def trait_detail(prediction):
+    """선택한 형질 하나의 상세 결과만 그리기 - 선택 전에는 아무것도 그리지 않음"""
+    trait = st.selectbox(
+        "🔍 상세히 볼 형질",
+        options=traits_data.ids,
+        index=None,
+        format_func=lambda trait_id: traits_data.get(trait_id)['name'],
+        placeholder="형질을 선택하세요"
+    )
+    if trait is None:
+        return
+    trait = traits_data.get(trait)
+    
+    result = prediction['traits'][trait['id']]
+    
+    # 부모 유전자형 표시
+    col1, col2, col3 = st.columns([1, 0.2, 1])
+    with col1:
+        st.info(f"**본인의 유전자형**\n\n`{result['user']}`")
+    with col2:
+        st.markdown("<br>**×**", unsafe_allow_html=True)
+    with col3:
+        st.info(f"**배우자의 유전자형**\n\n`{result['spouse']}`")
+    
+    if result['polygenic']:
+        st.success(f"📈 **{result['outcomes'][0]}** 경향을 보일 가능성이 높습니다.")
+        st.caption("※ 다인자 유전은 여러 유전자의 복합 작용으로 나타나므로 중간값 경향을 보입니다.")
+    else:
+        st.dataframe(
+            prediction_columns([trait], prediction),
+            column_config={
+                "확률": st.column_config.ProgressColumn("확률", format="percent", min_value=0, max_value=1)
+            },
+            hide_index=True
+        )
 
 # ==========================================
 # 메인 화면
@@ -270,6 +214,11 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # 이어하기 코드로 저장된 진행 상황 불러오기
+    resume_sidebar(APP_NAME, traits_data, restore_session)
+    
+    st.markdown("---")
+    
     if st.button("🔄 처음부터 다시 시작"):
         st.session_state.page = 'user'
         st.session_state.user_data = {}
@@ -284,29 +233,7 @@ if st.session_state.page == 'user':
     st.header("🙋 본인의 형질을 선택하세요")
     st.info("💡 가족 중에 다른 형질을 가진 사람이 있다면 이형접합(Dd)을 선택하세요.")
     
-    col1, col2 = st.columns(2)
-    
-    for i, trait in enumerate(traits_data):
-        col = col1 if i % 2 == 0 else col2
-        
-        with col:
-            with st.container():
-                st.subheader(f"🧬 {trait['name']}")
-                st.caption(f"우성: {trait['dominant']} / 열성: {trait['recessive']}")
-                
-                selected = st.selectbox(
-                    "선택하세요",
-                    options=list(trait['options'].keys()),
-                    key=f"user_{trait['id']}",
-                    label_visibility="collapsed"
-                )
-                
-                # 유전자형 표시
-                genotype = trait['options'][selected]
-                st.caption(f"유전자형: `{genotype}`")
-                
-                st.session_state.user_data[trait['id']] = genotype
-                st.markdown("---")
+    trait_inputs("user")
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -320,29 +247,7 @@ elif st.session_state.page == 'spouse':
     st.header("💑 배우자의 형질을 선택하세요")
     st.info("💡 배우자의 가족 구성원도 고려하여 유전자형을 선택하세요.")
     
-    col1, col2 = st.columns(2)
-    
-    for i, trait in enumerate(traits_data):
-        col = col1 if i % 2 == 0 else col2
-        
-        with col:
-            with st.container():
-                st.subheader(f"🧬 {trait['name']}")
-                st.caption(f"우성: {trait['dominant']} / 열성: {trait['recessive']}")
-                
-                selected = st.selectbox(
-                    "선택하세요",
-                    options=list(trait['options'].keys()),
-                    key=f"spouse_{trait['id']}",
-                    label_visibility="collapsed"
-                )
-                
-                # 유전자형 표시
-                genotype = trait['options'][selected]
-                st.caption(f"유전자형: `{genotype}`")
-                
-                st.session_state.spouse_data[trait['id']] = genotype
-                st.markdown("---")
+    trait_inputs("spouse")
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -361,74 +266,46 @@ elif st.session_state.page == 'results':
     st.success("🎉 Punnett Square를 이용한 유전 확률 분석이 완료되었습니다!")
     st.markdown("---")
     
+    # 같은 조합은 다른 세션에서 계산한 결과를 재사용
+    predict_started = time.perf_counter()
+    prediction = cached_predict(
+        traits_data,
+        st.session_state.user_data,
+        st.session_state.spouse_data,
+        compute=st.session_state.predictor.predict
+    )
+    log_event('prediction', duration_ms=round((time.perf_counter() - predict_started) * 1000, 2))
+    
+    # 부모 한쪽 유전자형을 바꿔 보는 경우를 형질 전체에 대해 한 번에 미리 계산
+    matrix = sensitivity_matrix(
+        traits_data,
+        st.session_state.user_data,
+        st.session_state.spouse_data
+    )
+    
     # 결과를 탭으로 구성
-    tab1, tab2 = st.tabs(["📊 상세 결과", "📋 요약"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 상세 결과", "📋 요약", "🔀 만약에?", "👨‍👩‍👧‍👦 여러 자녀"])
     
     with tab1:
-        for trait in traits_data:
-            trait_id = trait['id']
-            user_gen = st.session_state.user_data[trait_id]
-            spouse_gen = st.session_state.spouse_data[trait_id]
-            
-            outcomes = punnett_square(user_gen, spouse_gen)
-            
-            with st.expander(f"🧬 {trait['name']}", expanded=True):
-                # 부모 유전자형 표시
-                col1, col2, col3 = st.columns([1, 0.2, 1])
-                with col1:
-                    st.info(f"**본인의 유전자형**\n\n`{user_gen}`")
-                with col2:
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    st.markdown("**×**", unsafe_allow_html=True)
-                with col3:
-                    st.info(f"**배우자의 유전자형**\n\n`{spouse_gen}`")
-                
-                st.markdown("**자녀의 예상 형질:**")
-                
-                # Punnett Square 결과
-                if outcomes[0] in ['높음/어두움', '중간', '낮음/밝음']:
-                    st.success(f"📈 **{outcomes[0]}** 경향을 보일 가능성이 높습니다.")
-                    st.caption("※ 다인자 유전은 여러 유전자의 복합 작용으로 나타나므로 중간값 경향을 보입니다.")
-                else:
-                    counts = Counter(outcomes)
-                    
-                    # 확률 차트
-                    for genotype, count in counts.items():
-                        prob = (count / len(outcomes)) * 100
-                        phenotype = get_phenotype(genotype)
-                        
-                        # 프로그레스 바로 확률 표시
-                        st.markdown(f"**{genotype}** ({phenotype})")
-                        st.progress(prob / 100)
-                        st.caption(f"확률: {prob:.1f}% ({count}/4)")
-                
-                st.markdown("---")
+        # 모든 형질 x 유전자형 확률을 차트 하나로 표시
+        st.bar_chart(
+            prediction_columns(traits_data, prediction),
+            x="형질",
+            y="확률",
+            color="유전자형",
+            horizontal=True
+        )
+        st.caption("※ 다인자 유전(키, 피부색)은 예상 경향 하나만 100%로 표시됩니다.")
+        
+        st.markdown("---")
+        trait_detail(prediction)
     
     with tab2:
         st.subheader("📋 우성 형질 vs 열성 형질 요약")
         
-        dominant_count = 0
-        recessive_count = 0
-        mixed_count = 0
-        
-        for trait in traits_data:
-            trait_id = trait['id']
-            user_gen = st.session_state.user_data[trait_id]
-            spouse_gen = st.session_state.spouse_data[trait_id]
-            outcomes = punnett_square(user_gen, spouse_gen)
-            
-            if outcomes[0] in ['높음/어두움', '중간', '낮음/밝음']:
-                mixed_count += 1
-            else:
-                counts = Counter(outcomes)
-                dominant_prob = sum(count for gen, count in counts.items() if 'D' in gen) / len(outcomes)
-                
-                if dominant_prob >= 0.75:
-                    dominant_count += 1
-                elif dominant_prob <= 0.25:
-                    recessive_count += 1
-                else:
-                    mixed_count += 1
+        dominant_count = prediction['summary']['dominant']
+        recessive_count = prediction['summary']['recessive']
+        mixed_count = prediction['summary']['mixed']
         
         col1, col2, col3 = st.columns(3)
         
@@ -446,6 +323,17 @@ elif st.session_state.page == 'results':
         - 열성 형질 우세: 열성 형질이 나타날 확률이 75% 이상
         """)
     
+    with tab3:
+        st.subheader("🔀 유전자형을 바꾸면 어떻게 될까?")
+        st.caption("배우자 재입력 없이, 부모 한쪽의 유전자형만 바꿨을 때의 자녀 확률을 형질별로 비교합니다.")
+        sensitivity_view(
+            traits_data, matrix, st.session_state.user_data, st.session_state.spouse_data
+        )
+    
+    with tab4:
+        st.subheader("👨‍👩‍👧‍👦 자녀가 여러 명이라면?")
+        siblings_view(traits_data, matrix['current'])
+    
     st.markdown("<br>", unsafe_allow_html=True)
     
     # 버튼들
@@ -461,6 +349,12 @@ elif st.session_state.page == 'results':
             st.session_state.spouse_data = {}
             st.rerun()
 
+# 입력 내용이 바뀌었으면 저장
+save_progress()
+
+# rerun 소요 시간 기록
+log_event('rerun', duration_ms=round((time.perf_counter() - rerun_started) * 1000, 1))
+
 # 푸터
 st.markdown("---")
 st.caption("💡 이 프로그램은 멘델 유전 법칙을 기반으로 한 간단한 예측 모델입니다. 실제 유전은 더 복잡할 수 있습니다.")
\ No newline at end of file
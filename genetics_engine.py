@@ -0,0 +1,340 @@
+# 유전 형질 예측 엔진
+#
+# 두 Streamlit 앱(genetics_app.py, genetics_photo_version.py)이 공유하는
+# Punnett Square 로직과, 이를 numpy 배열 연산용으로 펼친 조회 테이블.
+# Streamlit을 import하지 않으므로 배치 도구에서도 그대로 사용할 수 있다.
+
+import numpy as np
+
+# 다인자 유전 형질의 입력값과 결과값
+POLYGENIC_GENOTYPES = ['tall', 'medium', 'short', 'dark', 'light']
+POLYGENIC_OUTCOMES = ['높음/어두움', '중간', '낮음/밝음']
+
+# ==========================================
+# Punnett Square 함수들
+# ==========================================
+
+def punnett_square(g1, g2):
+    """Punnett Square를 이용한 자녀 유전자형 계산"""
+    # 다인자 유전 형질 처리
+    if g1 in POLYGENIC_GENOTYPES:
+        return predict_polygenic(g1, g2)
+
+    # 단일 유전자 형질 처리
+    outcomes = []
+    for a1 in g1:
+        for a2 in g2:
+            genotype = ''.join(sorted([a1, a2], reverse=True))
+            outcomes.append(genotype)
+    return outcomes
+
+def predict_polygenic(p1, p2):
+    """다인자 유전 형질 예측"""
+    values = {'tall': 3, 'medium': 2, 'short': 1, 'dark': 3, 'light': 1}
+    avg = (values.get(p1, 2) + values.get(p2, 2)) / 2
+
+    if avg >= 2.5:
+        return ['높음/어두움']
+    elif avg >= 1.5:
+        return ['중간']
+    return ['낮음/밝음']
+
+def get_phenotype(genotype):
+    """유전자형에서 표현형 결정"""
+    if genotype in POLYGENIC_OUTCOMES:
+        return genotype
+    return '우성 형질 표현' if 'D' in genotype else '열성 형질 표현'
+
+# ==========================================
+# 유전자형 정수 코드와 자녀 분포 테이블
+# ==========================================
+
+# 유전자형 코드 = 열성(낮은 쪽) 대립유전자 개수
+#   단일 유전자: DD=0, Dd=1, dd=2
+#   다인자 유전: tall/dark=0, medium=1, short/light=2
+GENOTYPE_CODES = {
+    'DD': 0, 'Dd': 1, 'dd': 2,
+    'tall': 0, 'medium': 1, 'short': 2,
+    'dark': 0, 'light': 2,
+}
+MENDELIAN_GENOTYPES = ['DD', 'Dd', 'dd']
+N_GENOTYPES = 3
+
+# 자녀 코드 순서의 표시 이름 (punnett_square가 돌려주는 표기와 같게 맞춤)
+MENDELIAN_OUTCOMES = ['DD', 'dD', 'dd']
+
+# 자녀 코드: 단일 유전자는 DD/Dd/dd, 다인자 유전은 POLYGENIC_OUTCOMES 순서
+# (punnett_square는 이형접합을 정렬 순서상 'dD'로 반환한다)
+OUTCOME_CODES = {'DD': 0, 'Dd': 1, 'dD': 1, 'dd': 2}
+OUTCOME_CODES.update({label: i for i, label in enumerate(POLYGENIC_OUTCOMES)})
+
+def is_polygenic(trait):
+    """형질 정의(traits_data 항목)가 다인자 유전인지 여부"""
+    if 'polygenic' in trait:  # trait_registry에서 미리 계산해 둔 값
+        return trait['polygenic']
+    return any(g in POLYGENIC_GENOTYPES for g in trait['options'].values())
+
+def _build_table(parent_genotypes):
+    """punnett_square 결과를 (부모1 코드, 부모2 코드, 자녀 코드) 확률 테이블로 변환"""
+    table = np.zeros((N_GENOTYPES, N_GENOTYPES, N_GENOTYPES))
+    for i, g1 in enumerate(parent_genotypes):
+        for j, g2 in enumerate(parent_genotypes):
+            outcomes = punnett_square(g1, g2)
+            for outcome in outcomes:
+                table[i, j, OUTCOME_CODES[outcome]] += 1 / len(outcomes)
+    return table
+
+# punnett_square와 같은 규칙으로 한 번만 계산해 두는 테이블
+MENDELIAN_TABLE = _build_table(MENDELIAN_GENOTYPES)
+POLYGENIC_TABLE = _build_table(['tall', 'medium', 'short'])
+
+def offspring_tables(traits):
+    """
+    형질 목록에 맞춰 자녀 분포 테이블을 쌓아서 반환
+
+    반환: (형질 수, 3, 3, 3) 배열 - [t, 부모1 코드, 부모2 코드, 자녀 코드]
+          (trait_registry 레지스트리면 미리 쌓아 둔 읽기 전용 테이블)
+    """
+    tables = getattr(traits, 'tables', None)
+    if tables is not None:
+        return tables
+    return np.stack([
+        POLYGENIC_TABLE if is_polygenic(trait) else MENDELIAN_TABLE
+        for trait in traits
+    ])
+
+def trait_ids(traits):
+    """형질 목록의 id 순서 (레지스트리면 미리 만들어 둔 튜플)"""
+    ids = getattr(traits, 'ids', None)
+    return ids if ids is not None else [trait['id'] for trait in traits]
+
+def encode_genotypes(rows, trait_ids):
+    """
+    {trait_id: genotype} 딕셔너리 목록을 정수 코드 배열로 변환
+
+    반환: (행 수, 형질 수) int8 배열
+    """
+    codes = np.empty((len(rows), len(trait_ids)), dtype=np.int8)
+    for r, row in enumerate(rows):
+        for t, trait_id in enumerate(trait_ids):
+            codes[r, t] = GENOTYPE_CODES[row[trait_id]]
+    return codes
+
+# ==========================================
+# 혼합(확률) 유전자형
+# ==========================================
+
+# 사진 분석처럼 하나로 확정할 수 없는 경우 유전자형 대신 {genotype: 확률} 딕셔너리를 쓴다.
+# 예: {'DD': 0.2, 'Dd': 0.7, 'dd': 0.1}
+# 자녀 분포는 경우의 수를 나열하지 않고 테이블에 부모 확률 벡터를 곱해 한 번에 계산한다.
+
+def is_mixture(genotype):
+    """혼합 유전자형({genotype: 확률}) 여부"""
+    return isinstance(genotype, dict)
+
+def genotype_vector(genotype):
+    """유전자형 또는 혼합 유전자형을 코드별 확률 벡터 (3,)으로 변환"""
+    vector = np.zeros(N_GENOTYPES)
+    if not is_mixture(genotype):
+        vector[GENOTYPE_CODES[genotype]] = 1.0
+        return vector
+    for g, p in genotype.items():
+        vector[GENOTYPE_CODES[g]] += p
+    return vector / vector.sum()
+
+def most_likely(genotype):
+    """혼합 유전자형이면 확률이 가장 큰 유전자형, 아니면 그대로"""
+    if not is_mixture(genotype):
+        return genotype
+    return max(genotype, key=genotype.get)
+
+def freeze_genotype(genotype):
+    """캐시 키 등에 쓸 수 있도록 혼합 유전자형을 정렬된 tuple로 (확률은 소수점 3자리)"""
+    if not is_mixture(genotype):
+        return genotype
+    return tuple(sorted((g, round(p, 3)) for g, p in genotype.items()))
+
+def format_genotype(genotype):
+    """화면 표시용 문자열 - 혼합이면 확률 높은 순으로 'Dd 70% · DD 20% · ...'"""
+    if not is_mixture(genotype):
+        return genotype
+    ranked = sorted(genotype.items(), key=lambda item: -item[1])
+    return " · ".join(f"{g} {p:.0%}" for g, p in ranked if p >= 0.005)
+
+def mixture_offspring(tables, user_probs, spouse_probs):
+    """
+    부모 확률 벡터로 가중한 자녀 분포 (닫힌 식, 배치 차원 지원)
+
+    tables: (형질 수, 3, 3, 3) offspring_tables 결과
+    user_probs, spouse_probs: (..., 형질 수, 3) 부모별 유전자형 코드 확률
+    반환: (..., 형질 수, 3) 자녀 코드 확률
+    """
+    return np.einsum('...ti,...tj,tijk->...tk', user_probs, spouse_probs, tables)
+
+def encode_genotype_probs(rows, trait_ids):
+    """
+    유전자형 또는 혼합 유전자형 딕셔너리 목록을 확률 배열로 변환
+
+    반환: (행 수, 형질 수, 3) 배열
+    """
+    probs = np.empty((len(rows), len(trait_ids), N_GENOTYPES))
+    for r, row in enumerate(rows):
+        for t, trait_id in enumerate(trait_ids):
+            probs[r, t] = genotype_vector(row[trait_id])
+    return probs
+
+def predict_mixture_batch(traits, user_rows, spouse_rows):
+    """
+    여러 부부의 자녀 분포를 한 번에 계산 (애매한 사진 배치 처리용)
+
+    user_rows, spouse_rows: 같은 길이의 {trait_id: 유전자형 또는 혼합} 목록
+    반환: (부부 수, 형질 수, 3) 자녀 코드 확률
+    """
+    ids = trait_ids(traits)
+    return mixture_offspring(
+        offspring_tables(traits),
+        encode_genotype_probs(user_rows, ids),
+        encode_genotype_probs(spouse_rows, ids),
+    )
+
+def genotype_labels(trait):
+    """형질의 유전자형 코드 순서 이름 (예: ['DD', 'Dd', 'dd'], ['tall', 'medium', 'short'])"""
+    if 'genotypes' in trait:
+        return list(trait['genotypes'])
+    if not is_polygenic(trait):
+        return list(MENDELIAN_GENOTYPES)
+    labels = [None] * N_GENOTYPES
+    for genotype in trait['options'].values():
+        code = GENOTYPE_CODES[genotype]
+        labels[code] = labels[code] or genotype
+    return labels
+
+def sensitivity_matrix(traits, user_data, spouse_data, default=None):
+    """
+    부모 한쪽의 유전자형만 바꿔 볼 때의 자녀 분포를 모든 형질, 모든 대안에 대해 한 번에 계산
+
+    반환: {'current': (형질 수, 3) 현재 입력의 자녀 코드 확률,
+           'user': (형질 수, 3, 3) [t, 본인 대안 코드, 자녀 코드] (배우자는 그대로),
+           'spouse': (형질 수, 3, 3) [t, 배우자 대안 코드, 자녀 코드] (본인은 그대로),
+           'user_probs', 'spouse_probs': (형질 수, 3) 현재 부모 유전자형 코드 확률}
+    """
+    pairs = [parent_genotypes(trait['id'], user_data, spouse_data, default) for trait in traits]
+    user_probs = np.array([genotype_vector(user_gen) for user_gen, _ in pairs])
+    spouse_probs = np.array([genotype_vector(spouse_gen) for _, spouse_gen in pairs])
+    tables = offspring_tables(traits)
+    return {
+        'current': mixture_offspring(tables, user_probs, spouse_probs),
+        'user': np.einsum('tj,tijk->tik', spouse_probs, tables),
+        'spouse': np.einsum('ti,tijk->tjk', user_probs, tables),
+        'user_probs': user_probs,
+        'spouse_probs': spouse_probs,
+    }
+
+# ==========================================
+# 부부 단위 전체 예측
+# ==========================================
+
+def predict_trait(user_gen, spouse_gen):
+    """
+    한 형질의 자녀 유전자형 분포
+
+    부모 중 한쪽이라도 혼합 유전자형이면 predict_mixture_trait로 계산한다.
+    반환: {'user', 'spouse', 'outcomes', 'counts', 'probs', 'polygenic'}
+          probs = {자녀 유전자형: 확률}
+    """
+    if is_mixture(user_gen) or is_mixture(spouse_gen):
+        return predict_mixture_trait(user_gen, spouse_gen)
+
+    outcomes = punnett_square(user_gen, spouse_gen)
+    counts = {}
+    for genotype in outcomes:
+        counts[genotype] = counts.get(genotype, 0) + 1
+
+    return {
+        'user': user_gen,
+        'spouse': spouse_gen,
+        'outcomes': outcomes,
+        'counts': counts,
+        'probs': {genotype: count / len(outcomes) for genotype, count in counts.items()},
+        'polygenic': outcomes[0] in POLYGENIC_OUTCOMES,
+    }
+
+def predict_mixture_trait(user_gen, spouse_gen):
+    """
+    혼합 유전자형 부모의 자녀 분포 - 테이블 한 장에 부모 확률 벡터를 곱해 계산
+
+    반환: predict_trait와 같은 형태 ('outcomes'는 확률 높은 순, 'counts'는 None)
+    """
+    genotypes = [g for parent in (user_gen, spouse_gen)
+                 for g in (parent if is_mixture(parent) else [parent])]
+    polygenic = any(g in POLYGENIC_GENOTYPES for g in genotypes)
+    table = POLYGENIC_TABLE if polygenic else MENDELIAN_TABLE
+    labels = POLYGENIC_OUTCOMES if polygenic else MENDELIAN_OUTCOMES
+
+    distribution = mixture_offspring(table[None], genotype_vector(user_gen)[None],
+                                     genotype_vector(spouse_gen)[None])[0]
+    probs = {label: float(p) for label, p in zip(labels, distribution) if p > 0}
+
+    return {
+        'user': user_gen,
+        'spouse': spouse_gen,
+        'outcomes': sorted(probs, key=probs.get, reverse=True),
+        'counts': None,
+        'probs': probs,
+        'polygenic': polygenic,
+    }
+
+def summarize_predictions(per_trait):
+    """형질별 예측을 우성 우세 / 혼합·중간 / 열성 우세 개수로 요약"""
+    summary = {'dominant': 0, 'mixed': 0, 'recessive': 0}
+    for result in per_trait.values():
+        if result['polygenic']:
+            summary['mixed'] += 1
+            continue
+
+        dominant_prob = sum(p for gen, p in result['probs'].items() if 'D' in gen)
+        if dominant_prob >= 0.75:
+            summary['dominant'] += 1
+        elif dominant_prob <= 0.25:
+            summary['recessive'] += 1
+        else:
+            summary['mixed'] += 1
+    return summary
+
+def parent_genotypes(trait_id, user_data, spouse_data, default=None):
+    """부모 데이터에서 형질 유전자형(또는 혼합 유전자형) 조회 (default가 None이면 없을 때 KeyError)"""
+    if default is None:
+        return user_data[trait_id], spouse_data[trait_id]
+    return user_data.get(trait_id, default), spouse_data.get(trait_id, default)
+
+def predict_children(traits, user_data, spouse_data, default=None):
+    """
+    모든 형질에 대해 자녀 유전자형 분포와 우성/열성 요약 계산
+
+    default: 부모 데이터에 형질이 없을 때 사용할 유전자형 (None이면 KeyError)
+    반환: {'traits': {trait_id: predict_trait 결과},
+           'summary': {'dominant', 'mixed', 'recessive'}}
+    """
+    per_trait = {}
+    for trait in traits:
+        user_gen, spouse_gen = parent_genotypes(trait['id'], user_data, spouse_data, default)
+        per_trait[trait['id']] = predict_trait(user_gen, spouse_gen)
+
+    return {'traits': per_trait, 'summary': summarize_predictions(per_trait)}
+
+def prediction_columns(traits, prediction):
+    """
+    형질 x 유전자형 확률을 하나의 tidy 표로 펼침
+
+    반환: {'형질', '유전자형', '표현형', '확률'} 열 단위 딕셔너리
+          (st.bar_chart / st.dataframe에 그대로 전달 가능)
+    """
+    columns = {'형질': [], '유전자형': [], '표현형': [], '확률': []}
+    for trait in traits:
+        result = prediction['traits'][trait['id']]
+        for genotype, p in result['probs'].items():
+            columns['형질'].append(trait['name'])
+            columns['유전자형'].append(genotype)
+            columns['표현형'].append(get_phenotype(genotype))
+            columns['확률'].append(p)
+    return columns
@@ -4,12 +4,32 @@
 # 추가 설치 필요:
 # pip install streamlit opencv-python pillow numpy mediapipe
 
+import time
+from functools import partial
+
 import streamlit as st
-from collections import Counter
-import cv2
-import numpy as np
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from PIL import Image
-import io
+
+from event_log import log_session_event
+from genetics_engine import (
+    format_genotype, is_mixture, most_likely, prediction_columns, sensitivity_matrix
+)
+from incremental import IncrementalPredictor
+from job_queue import ACTIVE_STATUSES, CANCELLED, FAILED, QUEUED, JobLimitError, shared_queue
+from photo_jobs import photo_job
+from photo_quality import quality_messages
+from prediction_cache import cached_predict
+from result_views import sensitivity_view, siblings_view
+from session_memory import (
+    enforce_budget, ledger as memory_ledger, release_photo, upload_key
+)
+from session_resume import resume_from_url, resume_sidebar, save_progress as save_session
+from trait_registry import load_registry
+from warm_start import WARM_START, start_warm_up
+
+APP_NAME = 'photo'
+rerun_started = time.perf_counter()
 
 # 페이지 설정
 st.set_page_config(
@@ -42,251 +62,177 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 형질 데이터 - 자동/수동 구분
-traits_data = [
-    {
-        'id': 'hair_color',
-        'name': '머리카락 색',
-        'auto_detect': True,  # 사진으로 자동 인식 가능
-        'dominant': '검정/갈색',
-        'recessive': '금발/적발',
-        'options': {
-            '검정/갈색 (가족 모두 어두운 머리)': 'DD',
-            '검정/갈색 (가족 중 밝은 머리도 있음)': 'Dd',
-            '금발/적발': 'dd'
-        }
-    },
-    {
-        'id': 'hair_texture',
-        'name': '머리카락 모양',
-        'auto_detect': True,
-        'dominant': '곱슬머리',
-        'recessive': '직모',
-        'options': {
-            '곱슬머리 (가족 모두 곱슬)': 'DD',
-            '곱슬머리 (가족 중 직모도 있음)': 'Dd',
-            '직모': 'dd'
-        }
-    },
-    {
-        'id': 'skin',
-        'name': '피부색',
-        'auto_detect': True,
-        'dominant': '어두운 피부',
-        'recessive': '밝은 피부',
-        'options': {
-            '어두운 피부': 'dark',
-            '중간 톤 피부': 'medium',
-            '밝은 피부': 'light'
-        }
-    },
-    {
-        'id': 'dimples',
-        'name': '보조개',
-        'auto_detect': False,  # 수동 입력 필요
-        'dominant': '있음',
-        'recessive': '없음',
-        'options': {
-            '보조개 있음 (가족 대부분 있음)': 'DD',
-            '보조개 있음 (가족 중 없는 사람도 있음)': 'Dd',
-            '보조개 없음': 'dd'
-        }
-    },
-    {
-        'id': 'double_eyelid',
-        'name': '쌍꺼풀',
-        'auto_detect': False,
-        'dominant': '있음',
-        'recessive': '없음',
-        'options': {
-            '쌍꺼풀 있음 (진함)': 'DD',
-            '쌍꺼풀 있음 (약함)': 'Dd',
-            '쌍꺼풀 없음': 'dd'
-        }
-    },
-    {
-        'id': 'nose',
-        'name': '코 모양',
-        'auto_detect': False,
-        'dominant': '오똑한 코',
-        'recessive': '낮은 코',
-        'options': {
-            '오똑한 코': 'DD',
-            '중간 높이 코': 'Dd',
-            '낮은 코': 'dd'
-        }
-    },
-    {
-        'id': 'lips',
-        'name': '입술 두께',
-        'auto_detect': False,
-        'dominant': '두꺼운 입술',
-        'recessive': '얇은 입술',
-        'options': {
-            '두꺼운 입술': 'DD',
-            '중간 두께 입술': 'Dd',
-            '얇은 입술': 'dd'
-        }
-    },
-    {
-        'id': 'earlobe',
-        'name': '귓볼',
-        'auto_detect': False,
-        'dominant': '분리형',
-        'recessive': '부착형',
-        'options': {
-            '분리형 귓볼': 'DD',
-            '약간 분리된 귓볼': 'Dd',
-            '부착형 귓볼': 'dd'
-        }
-    },
-    {
-        'id': 'height',
-        'name': '키',
-        'auto_detect': False,
-        'dominant': '큰 키',
-        'recessive': '작은 키',
-        'options': {
-            '매우 큼 (여 170cm 이상/남 180cm 이상)': 'tall',
-            '중간 (여 160-170cm/남 170-180cm)': 'medium',
-            '작음 (여 160cm 이하/남 170cm 이하)': 'short'
-        }
-    }
-]
+# 형질 데이터 (traits.json에서 한 번 읽어 컴파일한 읽기 전용 레지스트리)
+traits_data = load_registry('photo')
+
+# 프로세스당 한 번 백그라운드에서 모델, 분석기 예열 (warm_start.py 참고)
+@st.cache_resource(show_spinner=False)
+def warm_start():
+    return start_warm_up(APP_NAME)
+
+if WARM_START:
+    warm_start()
 
 # ==========================================
 # AI 분석 함수들
 # ==========================================
 
-def analyze_hair_color(image):
-    """
-    사진에서 머리카락 색 분석
-    
-    반환: 'DD', 'Dd', 'dd'
-    """
-    # 이미지를 numpy array로 변환
-    img_array = np.array(image)
-    
-    # BGR로 변환 (OpenCV 포맷)
-    img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-    
-    # HSV로 변환 (색상 분석에 유리)
-    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
-    
-    # 상단 30% 영역 (머리 영역 추정)
-    height, width = hsv.shape[:2]
-    hair_region = hsv[0:int(height*0.3), :]
-    
-    # 평균 밝기 계산 (V 채널)
-    avg_brightness = np.mean(hair_region[:, :, 2])
-    
-    # 밝기로 분류
-    if avg_brightness > 150:  # 밝은 머리 (금발/적발)
-        return 'dd'
-    elif avg_brightness > 100:  # 중간 (혼합 가능성)
-        return 'Dd'
-    else:  # 어두운 머리
-        return 'DD'
+# 단체 사진에서 얼굴마다 고를 수 있는 역할
+FACE_ROLES = ["선택 안 함", "본인", "배우자", "가족"]
+
+# 사진 분석(photo_jobs.py)은 프로세스 전체가 공유하는 작업 큐에서 실행
+jobs = shared_queue()
+jobs.register('photo', photo_job)
+JOB_POLL_SECONDS = 0.5
+
+def submit_photo_job(role, uploaded_file, group=False):
+    """업로드한 사진의 분석 작업 제출 - 세션별 동시 작업 수 제한을 넘으면 안내만 표시"""
+    ctx = get_script_run_ctx()
+    try:
+        st.session_state.photo_jobs[role] = jobs.submit(
+            ctx.session_id if ctx is not None else 'local',
+            'photo',
+            {'photo': uploaded_file.getvalue(), 'group': group}
+        )
+    except JobLimitError as e:
+        st.warning(f"⏳ {e}")
+        return
+    log_event('job_submitted', kind='photo', role=role, group=group)
+    # 분석 버튼 대신 진행 상태가 보이도록 다시 그림
+    st.rerun()
 
-def analyze_hair_texture(image):
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(role):
+    """분석 작업 진행 상태 - 이 영역만 주기적으로 다시 실행하며 작업이 끝났는지 확인"""
+    job = jobs.status(st.session_state.photo_jobs[role])
+    if job is not None and job['status'] in ACTIVE_STATUSES:
+        waiting = "분석 순서를 기다리는 중" if job['status'] == QUEUED else "AI가 사진을 분석하는 중"
+        st.info(f"⏳ {waiting}... ({time.time() - job['created']:.0f}초)")
+        if st.button("⏹️ 분석 취소", key=f"cancel_job_{role}"):
+            jobs.cancel(job['id'])
+        return
+    # 끝났으면 페이지 전체를 다시 실행해 결과 반영
+    st.rerun()
+
+def collect_photo_job(role):
     """
-    사진에서 머리카락 모양 분석 (직모/곱슬)
+    끝난 사진 분석 작업의 결과를 세션에 반영하고 화면에 표시
     
-    반환: 'DD', 'Dd', 'dd'
-    """
-    # 실제로는 더 복잡한 AI 모델 필요
-    # 여기서는 간단한 예시
-    img_array = np.array(image)
-    img_gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-    
-    # 가장자리 검출
-    edges = cv2.Canny(img_gray, 100, 200)
-    
-    # 상단 영역의 엣지 밀도로 곱슬 정도 추정
-    height = edges.shape[0]
-    hair_edges = edges[0:int(height*0.3), :]
-    edge_density = np.sum(hair_edges) / hair_edges.size
-    
-    if edge_density > 0.15:  # 엣지 많음 = 곱슬
-        return 'DD'
-    elif edge_density > 0.08:
-        return 'Dd'
-    else:  # 엣지 적음 = 직모
-        return 'dd'
-
-def analyze_skin_tone(image):
+    작업 기록이 없어졌으면(오래되어 삭제, 작업 DB 초기화 등) 끝난 작업으로 보고 오류를 표시한다.
+    반환: 이번 실행에서 결과를 반영했으면 True (작업이 없거나 아직 진행 중이면 False)
     """
-    사진에서 피부색 분석
+    job_id = st.session_state.photo_jobs.get(role)
+    if job_id is None:
+        return False
+    job = jobs.status(job_id)
+    if job is not None and job['status'] in ACTIVE_STATUSES:
+        return False
+    del st.session_state.photo_jobs[role]
+    
+    if job is None:
+        st.error("사진 분석 작업 기록을 찾을 수 없습니다. 다시 분석해주세요.")
+        log_event('photo_error', role=role, message='job not found')
+        return True
+    if job['status'] == CANCELLED:
+        st.info("⏹️ 사진 분석을 취소했습니다.")
+        log_event('job_cancelled', kind='photo', role=role)
+        return True
+    if job['status'] == FAILED:
+        st.error(f"사진 분석 중 오류: {job['error']}")
+        log_event('photo_error', role=role, message=job['error'])
+        return True
+    
+    result = jobs.result(job_id)
+    quality = result['quality']
+    rejected, warnings = quality_messages(quality)
+    for message in rejected:
+        st.error(f"📷 {message}")
+    if not quality['ok']:
+        log_event('photo_rejected', role=role, issues=quality['issues'], quality_ms=result['quality_ms'])
+        return True
+    
+    group = 'faces' in result
+    log_event(
+        'group_analyzed' if group else 'photo_analyzed',
+        role=role,
+        width=result['width'],
+        height=result['height'],
+        issues=quality['issues'],
+        faces=len(result['faces']) if group else 1,
+        quality_ms=result['quality_ms'],
+        duration_ms=result['duration_ms'],
+        queue_ms=round((job['started'] - job['created']) * 1000, 1)
+    )
     
-    반환: 'dark', 'medium', 'light'
-    """
-    img_array = np.array(image)
-    img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-    
-    # 얼굴 중앙 영역 추출 (간단한 방법)
-    height, width = img_bgr.shape[:2]
-    face_region = img_bgr[
-        int(height*0.3):int(height*0.7),
-        int(width*0.3):int(width*0.7)
-    ]
-    
-    # RGB 평균값 계산
-    avg_color = np.mean(face_region, axis=(0, 1))
-    brightness = np.mean(avg_color)
-    
-    if brightness < 100:
-        return 'dark'
-    elif brightness < 160:
-        return 'medium'
-    else:
-        return 'light'
+    if group:
+        if not result['faces']:
+            st.error("📷 사진에서 얼굴을 찾지 못했습니다. 얼굴이 정면으로 나온 사진을 올려주세요.")
+            return True
+        st.session_state.group_faces = result['faces']
+        release_photo(st.session_state, role, thumbnail=result['thumbnail'])
+        return True
+    
+    # 단체 사진이 아니면 한 사람 기준의 얼굴 크기 경고도 표시
+    for message in warnings:
+        st.warning(f"📷 {message}")
+    
+    st.session_state[f"{role}_data"].update(result['traits'])
+    st.session_state[f"{role}_photo_analyzed"] = True
+    st.session_state.photo_quality[role] = quality
+    # 유전자형만 남기고 원본 사진은 썸네일로 바꿔 해제
+    release_photo(st.session_state, role, thumbnail=result['thumbnail'])
+    st.success("✅ 사진 분석 완료!")
+    
+    # 분석 결과 미리보기
+    st.markdown("### 🔍 AI 분석 결과")
+    for trait_id, genotype in result['traits'].items():
+        trait = traits_data.get(trait_id)
+        st.info(f"**{trait['name']}**: {format_genotype(genotype)}")
+    
+    st.markdown("#### 📷 사진 품질")
+    show_quality(quality)
+    return True
 
-def analyze_photo(image):
+def assign_group_faces(assignments):
     """
-    사진을 분석하여 자동 인식 가능한 형질 추출
+    단체 사진 얼굴에 고른 역할을 적용
     
-    반환: 딕셔너리 {trait_id: genotype}
+    반환: 오류 문구 (없으면 None)
     """
-    results = {}
-    
-    try:
-        results['hair_color'] = analyze_hair_color(image)
-        results['hair_texture'] = analyze_hair_texture(image)
-        results['skin'] = analyze_skin_tone(image)
-        return results, True
-    except Exception as e:
-        st.error(f"사진 분석 중 오류: {str(e)}")
-        return {}, False
-
-# ==========================================
-# Punnett Square 함수들 (이전과 동일)
-# ==========================================
+    roles = list(assignments.values())
+    if roles.count("본인") != 1:
+        return "본인 얼굴을 하나만 선택해주세요."
+    if roles.count("배우자") > 1:
+        return "배우자 얼굴은 하나만 선택할 수 있습니다."
+    
+    faces = st.session_state.group_faces
+    st.session_state.relatives = []
+    for i, role in assignments.items():
+        if role == "본인":
+            st.session_state.user_data.update(faces[i]['traits'])
+            st.session_state.user_photo_analyzed = True
+            st.session_state.thumbnails['user'] = faces[i]['thumbnail']
+        elif role == "배우자":
+            st.session_state.spouse_data.update(faces[i]['traits'])
+            st.session_state.spouse_photo_analyzed = True
+            st.session_state.thumbnails['spouse'] = faces[i]['thumbnail']
+        elif role == "가족":
+            st.session_state.relatives.append(faces[i]['traits'])
+    st.session_state.group_faces = []
+    return None
 
-def punnett_square(g1, g2):
-    if g1 in ['tall', 'medium', 'short', 'dark', 'light']:
-        return predict_polygenic(g1, g2)
-    
-    outcomes = []
-    for a1 in g1:
-        for a2 in g2:
-            genotype = ''.join(sorted([a1, a2], reverse=True))
-            outcomes.append(genotype)
-    return outcomes
+def show_genotype(label, genotype):
+    """유전자형 metric - 혼합 유전자형이면 가장 가능성 높은 값과 확률 분포를 함께 표시"""
+    st.metric(label, most_likely(genotype))
+    if is_mixture(genotype):
+        st.caption(format_genotype(genotype))
 
-def predict_polygenic(p1, p2):
-    values = {'tall': 3, 'medium': 2, 'short': 1, 'dark': 3, 'light': 1}
-    avg = (values.get(p1, 2) + values.get(p2, 2)) / 2
-    
-    if avg >= 2.5:
-        return ['높음/어두움']
-    elif avg >= 1.5:
-        return ['중간']
-    return ['낮음/밝음']
-
-def get_phenotype(genotype):
-    if genotype in ['높음/어두움', '중간', '낮음/밝음']:
-        return genotype
-    return '우성 형질 표현' if 'D' in genotype else '열성 형질 표현'
+def show_quality(quality):
+    """품질 점수를 분석 결과와 함께 표시"""
+    cols = st.columns(3)
+    cols[0].metric("선명도", f"{quality['sharpness']:.0f}")
+    cols[1].metric("밝기", f"{quality['brightness']:.0f}")
+    cols[2].metric("얼굴 크기", f"{quality['face_fraction']:.0%}" if quality['face_count'] else "-")
 
 # ==========================================
 # 세션 상태 초기화
@@ -302,6 +248,137 @@ if 'user_photo_analyzed' not in st.session_state:
     st.session_state.user_photo_analyzed = False
 if 'spouse_photo_analyzed' not in st.session_state:
     st.session_state.spouse_photo_analyzed = False
+if 'predictor' not in st.session_state:
+    st.session_state.predictor = IncrementalPredictor()
+if 'thumbnails' not in st.session_state:
+    st.session_state.thumbnails = {}
+if 'upload_versions' not in st.session_state:
+    st.session_state.upload_versions = {}
+if 'photo_quality' not in st.session_state:
+    st.session_state.photo_quality = {}
+if 'group_faces' not in st.session_state:
+    st.session_state.group_faces = []
+if 'relatives' not in st.session_state:
+    st.session_state.relatives = []
+if 'photo_jobs' not in st.session_state:
+    st.session_state.photo_jobs = {}
+
+# 세션 id, 앱, 현재 페이지를 붙여 이벤트 기록 (event_log.log_session_event)
+log_event = partial(log_session_event, APP_NAME)
+
+# ==========================================
+# 세션 저장 / 이어하기
+# ==========================================
+
+def session_snapshot():
+    """
+    저장할 세션 요약 - (사람별 유전자형, 나머지 상태)
+    
+    사진 분석 결과는 유전자형과 품질 측정값만 남기므로 복원할 때 다시 분석하지 않는다.
+    """
+    people = {'user': st.session_state.user_data, 'spouse': st.session_state.spouse_data}
+    for i, relative in enumerate(st.session_state.relatives):
+        people[f"relative_{i}"] = relative
+    state = {
+        'page': st.session_state.page,
+        'user_photo_analyzed': st.session_state.user_photo_analyzed,
+        'spouse_photo_analyzed': st.session_state.spouse_photo_analyzed,
+        'photo_quality': st.session_state.photo_quality,
+    }
+    return people, state
+
+def restore_session(people, state):
+    """
+    이어하기로 불러온 가족, 분석 여부, 진행 단계 복원 (본인/배우자 유전자형은 session_resume이 되돌림)
+    
+    진행 중인 분석 작업은 취소하고, 사진 썸네일은 저장하지 않으므로 비운다.
+    """
+    for role in ('user', 'spouse'):
+        st.session_state[f"{role}_photo_analyzed"] = state.get(f"{role}_photo_analyzed", False)
+    st.session_state.relatives = list(people.values())
+    st.session_state.photo_quality = state.get('photo_quality', {})
+    st.session_state.page = state.get('page', 'user_upload')
+    st.session_state.thumbnails = {}
+    st.session_state.group_faces = []
+    for job_id in st.session_state.photo_jobs.values():
+        jobs.cancel(job_id)
+    st.session_state.photo_jobs = {}
+
+# 입력이 바뀌었을 때만 진행 상황 저장 (session_resume.save_progress)
+save_progress = partial(save_session, APP_NAME, traits_data, session_snapshot)
+
+# 주소에 이어하기 코드가 있으면 세션당 한 번 복원 (새로고침, 연결 끊김 후 돌아온 경우)
+resume_from_url(APP_NAME, traits_data, restore_session)
+
+# 페이지가 바뀐 첫 실행에서만 이동 이벤트 기록 (사용자 흐름 분석용)
+if st.session_state.get('logged_page') != st.session_state.page:
+    log_event('page_view', previous=st.session_state.get('logged_page'))
+    st.session_state.logged_page = st.session_state.page
+
+@st.fragment
+def manual_trait_inputs(role, manual_traits):
+    """수동 입력 위젯 영역 - 선택이 바뀌면 페이지 전체가 아니라 이 영역만 다시 실행"""
+    data = st.session_state[f"{role}_data"]
+    
+    col1, col2 = st.columns(2)
+    
+    for i, trait in enumerate(manual_traits):
+        col = col1 if i % 2 == 0 else col2
+        
+        with col:
+            st.subheader(f"🧬 {trait['name']}")
+            st.caption(f"우성: {trait['dominant']} / 열성: {trait['recessive']}")
+            
+            selected = st.selectbox(
+                "선택하세요",
+                options=trait['option_labels'],
+                key=f"{role}_{trait['id']}",
+                label_visibility="collapsed"
+            )
+            
+            genotype = trait['options'][selected]
+            st.caption(f"유전자형: `{genotype}`")
+            data[trait['id']] = genotype
+            st.markdown("---")
+    
+    save_progress()
+
+@st.fragment
+def trait_detail(prediction):
+    """선택한 형질 하나의 상세 결과만 그리기 - 선택 전에는 아무것도 그리지 않음"""
+    trait = st.selectbox(
+        "🔍 상세히 볼 형질",
+        options=traits_data.ids,
+        index=None,
+        format_func=lambda trait_id: traits_data.get(trait_id)['name'] + (
+            " 🤖" if traits_data.get(trait_id)['auto_detect'] else " ✍️"
+        ),
+        placeholder="형질을 선택하세요"
+    )
+    if trait is None:
+        return
+    trait = traits_data.get(trait)
+    
+    result = prediction['traits'][trait['id']]
+    
+    col1, col2, col3 = st.columns([1, 0.2, 1])
+    with col1:
+        st.info(f"**본인**\n\n`{format_genotype(result['user'])}`")
+    with col2:
+        st.markdown("<br>**×**", unsafe_allow_html=True)
+    with col3:
+        st.info(f"**배우자**\n\n`{format_genotype(result['spouse'])}`")
+    
+    if result['polygenic'] and len(result['probs']) == 1:
+        st.success(f"📈 **{result['outcomes'][0]}** 경향")
+    else:
+        st.dataframe(
+            prediction_columns([trait], prediction),
+            column_config={
+                "확률": st.column_config.ProgressColumn("확률", format="percent", min_value=0, max_value=1)
+            },
+            hide_index=True
+        )
 
 # ==========================================
 # 메인 화면
@@ -361,12 +438,24 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # 이어하기 코드로 저장된 진행 상황 불러오기
+    resume_sidebar(APP_NAME, traits_data, restore_session)
+    
+    st.markdown("---")
+    
     if st.button("🔄 처음부터 다시 시작"):
         st.session_state.page = 'user_upload'
         st.session_state.user_data = {}
         st.session_state.spouse_data = {}
         st.session_state.user_photo_analyzed = False
         st.session_state.spouse_photo_analyzed = False
+        st.session_state.thumbnails = {}
+        st.session_state.photo_quality = {}
+        st.session_state.group_faces = []
+        st.session_state.relatives = []
+        for job_id in st.session_state.photo_jobs.values():
+            jobs.cancel(job_id)
+        st.session_state.photo_jobs = {}
         st.rerun()
 
 # ==========================================
@@ -385,13 +474,20 @@ if st.session_state.page == 'user_upload':
     - 얼굴 전체가 나온 사진
     """)
     
+    group_mode = st.toggle("👨‍👩‍👧 가족 단체 사진으로 한 번에 분석", key="group_mode",
+                           help="사진 속 얼굴을 모두 분석한 뒤 본인/배우자/가족을 직접 지정합니다")
+    
     uploaded_file = st.file_uploader(
         "사진 선택 (JPG, PNG)",
         type=['jpg', 'jpeg', 'png'],
-        key='user_photo'
+        key=upload_key(st.session_state, 'user')
     )
     
     if uploaded_file is not None:
+        if st.session_state.get('logged_upload') != uploaded_file.file_id:
+            log_event('photo_upload', role='user', size=uploaded_file.size, type=uploaded_file.type)
+            st.session_state.logged_upload = uploaded_file.file_id
+        
         # 사진 표시
         image = Image.open(uploaded_file)
         
@@ -401,27 +497,49 @@ if st.session_state.page == 'user_upload':
         
         st.markdown("<br>", unsafe_allow_html=True)
         
-        # 분석 버튼
-        if st.button("🤖 AI로 사진 분석하기", type="primary", use_container_width=True):
-            with st.spinner("AI가 사진을 분석하는 중..."):
-                auto_results, success = analyze_photo(image)
-                
-                if success:
-                    st.session_state.user_data.update(auto_results)
-                    st.session_state.user_photo_analyzed = True
-                    st.success("✅ 사진 분석 완료!")
-                    
-                    # 분석 결과 미리보기
-                    st.markdown("### 🔍 AI 분석 결과")
-                    for trait_id, genotype in auto_results.items():
-                        trait = next(t for t in traits_data if t['id'] == trait_id)
-                        st.info(f"**{trait['name']}**: {genotype}")
-                    
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    
-                    if st.button("▶️ 다음 단계 (나머지 입력)", type="primary"):
-                        st.session_state.page = 'user_input'
-                        st.rerun()
+        if not collect_photo_job('user'):
+            if 'user' not in st.session_state.photo_jobs:
+                label = "🤖 사진 속 얼굴 모두 분석하기" if group_mode else "🤖 AI로 사진 분석하기"
+                if st.button(label, type="primary", use_container_width=True):
+                    submit_photo_job('user', uploaded_file, group=group_mode)
+            else:
+                job_progress('user')
+    
+    elif 'user' in st.session_state.thumbnails:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            st.image(st.session_state.thumbnails['user'], caption="분석한 사진")
+    
+    # 단체 사진 얼굴 지정
+    if st.session_state.group_faces:
+        st.markdown(f"### 👨‍👩‍👧 얼굴 {len(st.session_state.group_faces)}개를 찾았습니다")
+        with st.form("group_faces_form"):
+            assignments = {}
+            cols = st.columns(min(4, len(st.session_state.group_faces)))
+            for i, face in enumerate(st.session_state.group_faces):
+                with cols[i % len(cols)]:
+                    st.image(face['thumbnail'], caption=f"얼굴 {i + 1}")
+                    assignments[i] = st.selectbox(
+                        f"얼굴 {i + 1}", FACE_ROLES,
+                        index=min(i + 1, len(FACE_ROLES) - 1),
+                        key=f"face_role_{i}",
+                        label_visibility="collapsed"
+                    )
+            
+            if st.form_submit_button("✅ 얼굴 지정 완료", type="primary"):
+                error = assign_group_faces(assignments)
+                if error:
+                    st.error(error)
+                else:
+                    st.rerun()
+    
+    # 분석 버튼 블록 안에 두면 다음 실행 때 사라지므로 분석 여부로 표시
+    if st.session_state.user_photo_analyzed:
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        if st.button("▶️ 다음 단계 (나머지 입력)", type="primary"):
+            st.session_state.page = 'user_input'
+            st.rerun()
 
 # 2. 본인 나머지 형질 입력
 elif st.session_state.page == 'user_input':
@@ -429,42 +547,17 @@ elif st.session_state.page == 'user_input':
     
     # AI로 분석된 형질 표시
     st.success("✅ AI 분석 완료된 형질:")
-    auto_traits = [t for t in traits_data if t['auto_detect']]
     cols = st.columns(3)
-    for i, trait in enumerate(auto_traits):
+    for i, trait in enumerate(traits_data.auto):
         with cols[i % 3]:
             if trait['id'] in st.session_state.user_data:
-                st.metric(
-                    trait['name'],
-                    st.session_state.user_data[trait['id']]
-                )
+                show_genotype(trait['name'], st.session_state.user_data[trait['id']])
     
     st.markdown("---")
     st.info("📝 아래 항목들을 직접 선택해주세요:")
     
     # 수동 입력 필요한 형질
-    manual_traits = [t for t in traits_data if not t['auto_detect']]
-    
-    col1, col2 = st.columns(2)
-    
-    for i, trait in enumerate(manual_traits):
-        col = col1 if i % 2 == 0 else col2
-        
-        with col:
-            st.subheader(f"🧬 {trait['name']}")
-            st.caption(f"우성: {trait['dominant']} / 열성: {trait['recessive']}")
-            
-            selected = st.selectbox(
-                "선택하세요",
-                options=list(trait['options'].keys()),
-                key=f"user_{trait['id']}",
-                label_visibility="collapsed"
-            )
-            
-            genotype = trait['options'][selected]
-            st.caption(f"유전자형: `{genotype}`")
-            st.session_state.user_data[trait['id']] = genotype
-            st.markdown("---")
+    manual_trait_inputs("user", traits_data.manual)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -493,10 +586,14 @@ elif st.session_state.page == 'spouse_upload':
     uploaded_file = st.file_uploader(
         "사진 선택 (JPG, PNG)",
         type=['jpg', 'jpeg', 'png'],
-        key='spouse_photo'
+        key=upload_key(st.session_state, 'spouse')
     )
     
     if uploaded_file is not None:
+        if st.session_state.get('logged_upload') != uploaded_file.file_id:
+            log_event('photo_upload', role='spouse', size=uploaded_file.size, type=uploaded_file.type)
+            st.session_state.logged_upload = uploaded_file.file_id
+        
         image = Image.open(uploaded_file)
         
         col1, col2, col3 = st.columns([1, 2, 1])
@@ -505,72 +602,46 @@ elif st.session_state.page == 'spouse_upload':
         
         st.markdown("<br>", unsafe_allow_html=True)
         
-        if st.button("🤖 AI로 사진 분석하기", type="primary", use_container_width=True):
-            with st.spinner("AI가 사진을 분석하는 중..."):
-                auto_results, success = analyze_photo(image)
-                
-                if success:
-                    st.session_state.spouse_data.update(auto_results)
-                    st.session_state.spouse_photo_analyzed = True
-                    st.success("✅ 사진 분석 완료!")
-                    
-                    st.markdown("### 🔍 AI 분석 결과")
-                    for trait_id, genotype in auto_results.items():
-                        trait = next(t for t in traits_data if t['id'] == trait_id)
-                        st.info(f"**{trait['name']}**: {genotype}")
-                    
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if st.button("◀️ 이전"):
-                            st.session_state.page = 'user_input'
-                            st.rerun()
-                    with col2:
-                        if st.button("▶️ 다음 단계", type="primary"):
-                            st.session_state.page = 'spouse_input'
-                            st.rerun()
+        if not collect_photo_job('spouse'):
+            if 'spouse' not in st.session_state.photo_jobs:
+                if st.button("🤖 AI로 사진 분석하기", type="primary", use_container_width=True):
+                    submit_photo_job('spouse', uploaded_file)
+            else:
+                job_progress('spouse')
+    
+    elif 'spouse' in st.session_state.thumbnails:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            st.image(st.session_state.thumbnails['spouse'], caption="분석한 사진")
+    
+    if st.session_state.spouse_photo_analyzed:
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("◀️ 이전"):
+                st.session_state.page = 'user_input'
+                st.rerun()
+        with col2:
+            if st.button("▶️ 다음 단계", type="primary"):
+                st.session_state.page = 'spouse_input'
+                st.rerun()
 
 # 4. 배우자 나머지 형질 입력
 elif st.session_state.page == 'spouse_input':
     st.header("✍️ 배우자의 나머지 형질을 입력하세요")
     
     st.success("✅ AI 분석 완료된 형질:")
-    auto_traits = [t for t in traits_data if t['auto_detect']]
     cols = st.columns(3)
-    for i, trait in enumerate(auto_traits):
+    for i, trait in enumerate(traits_data.auto):
         with cols[i % 3]:
             if trait['id'] in st.session_state.spouse_data:
-                st.metric(
-                    trait['name'],
-                    st.session_state.spouse_data[trait['id']]
-                )
+                show_genotype(trait['name'], st.session_state.spouse_data[trait['id']])
     
     st.markdown("---")
     st.info("📝 아래 항목들을 직접 선택해주세요:")
     
-    manual_traits = [t for t in traits_data if not t['auto_detect']]
-    
-    col1, col2 = st.columns(2)
-    
-    for i, trait in enumerate(manual_traits):
-        col = col1 if i % 2 == 0 else col2
-        
-        with col:
-            st.subheader(f"🧬 {trait['name']}")
-            st.caption(f"우성: {trait['dominant']} / 열성: {trait['recessive']}")
-            
-            selected = st.selectbox(
-                "선택하세요",
-                options=list(trait['options'].keys()),
-                key=f"spouse_{trait['id']}",
-                label_visibility="collapsed"
-            )
-            
-            genotype = trait['options'][selected]
-            st.caption(f"유전자형: `{genotype}`")
-            st.session_state.spouse_data[trait['id']] = genotype
-            st.markdown("---")
+    manual_trait_inputs("spouse", traits_data.manual)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -590,57 +661,68 @@ elif st.session_state.page == 'results':
     st.success("🎉 AI 분석과 입력이 완료되었습니다!")
     st.markdown("---")
     
-    tab1, tab2 = st.tabs(["📊 상세 결과", "📋 요약"])
+    predict_started = time.perf_counter()
+    prediction = cached_predict(
+        traits_data,
+        st.session_state.user_data,
+        st.session_state.spouse_data,
+        default='Dd',
+        compute=st.session_state.predictor.predict
+    )
+    log_event('prediction', duration_ms=round((time.perf_counter() - predict_started) * 1000, 2))
+    
+    # 부모 한쪽 유전자형을 바꿔 보는 경우를 형질 전체에 대해 한 번에 미리 계산
+    matrix = sensitivity_matrix(
+        traits_data,
+        st.session_state.user_data,
+        st.session_state.spouse_data,
+        default='Dd'
+    )
+    
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 상세 결과", "📋 요약", "🔀 만약에?", "👨‍👩‍👧‍👦 여러 자녀"])
     
     with tab1:
-        for trait in traits_data:
-            trait_id = trait['id']
-            user_gen = st.session_state.user_data.get(trait_id, 'Dd')
-            spouse_gen = st.session_state.spouse_data.get(trait_id, 'Dd')
-            
-            outcomes = punnett_square(user_gen, spouse_gen)
-            
-            with st.expander(f"🧬 {trait['name']}" + (" 🤖" if trait['auto_detect'] else " ✍️"), expanded=True):
-                col1, col2, col3 = st.columns([1, 0.2, 1])
-                with col1:
-                    st.info(f"**본인**\n\n`{user_gen}`")
-                with col2:
-                    st.markdown("<br>**×**", unsafe_allow_html=True)
-                with col3:
-                    st.info(f"**배우자**\n\n`{spouse_gen}`")
-                
-                st.markdown("**자녀의 예상 형질:**")
-                
-                if outcomes[0] in ['높음/어두움', '중간', '낮음/밝음']:
-                    st.success(f"📈 **{outcomes[0]}** 경향")
-                else:
-                    counts = Counter(outcomes)
-                    for genotype, count in counts.items():
-                        prob = (count / len(outcomes)) * 100
-                        phenotype = get_phenotype(genotype)
-                        st.markdown(f"**{genotype}** ({phenotype})")
-                        st.progress(prob / 100)
-                        st.caption(f"확률: {prob:.1f}% ({count}/4)")
-                
-                st.markdown("---")
+        # 모든 형질 x 유전자형 확률을 차트 하나로 표시
+        st.bar_chart(
+            prediction_columns(traits_data, prediction),
+            x="형질",
+            y="확률",
+            color="유전자형",
+            horizontal=True
+        )
+        
+        st.markdown("---")
+        trait_detail(prediction)
     
     with tab2:
         st.subheader("📋 전체 요약")
         
         st.markdown("### 🤖 AI가 분석한 형질")
-        auto_analyzed = [t for t in traits_data if t['auto_detect']]
-        for trait in auto_analyzed:
+        for trait in traits_data.auto:
             col1, col2 = st.columns(2)
             with col1:
-                st.metric(
-                    f"본인 - {trait['name']}",
-                    st.session_state.user_data.get(trait['id'], 'N/A')
-                )
+                show_genotype(f"본인 - {trait['name']}", st.session_state.user_data.get(trait['id'], 'N/A'))
             with col2:
-                st.metric(
-                    f"배우자 - {trait['name']}",
-                    st.session_state.spouse_data.get(trait['id'], 'N/A')
-                )
+                show_genotype(f"배우자 - {trait['name']}", st.session_state.spouse_data.get(trait['id'], 'N/A'))
+        
+        if st.session_state.relatives:
+            st.markdown("### 👪 단체 사진 속 가족")
+            for i, relative in enumerate(st.session_state.relatives):
+                cols = st.columns(len(traits_data.auto))
+                for col, trait in zip(cols, traits_data.auto):
+                    with col:
+                        show_genotype(f"가족 {i + 1} - {trait['name']}", relative.get(trait['id'], 'N/A'))
+    
+    with tab3:
+        st.subheader("🔀 유전자형을 바꾸면 어떻게 될까?")
+        st.caption("배우자 재입력 없이, 부모 한쪽의 유전자형만 바꿨을 때의 자녀 확률을 형질별로 비교합니다.")
+        sensitivity_view(
+            traits_data, matrix, st.session_state.user_data, st.session_state.spouse_data, default='Dd'
+        )
+    
+    with tab4:
+        st.subheader("👨‍👩‍👧‍👦 자녀가 여러 명이라면?")
+        siblings_view(traits_data, matrix['current'])
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -656,7 +738,35 @@ elif st.session_state.page == 'results':
             st.session_state.spouse_data = {}
             st.session_state.user_photo_analyzed = False
             st.session_state.spouse_photo_analyzed = False
+            st.session_state.thumbnails = {}
+            st.session_state.photo_quality = {}
+            st.session_state.group_faces = []
+            st.session_state.relatives = []
+            for job_id in st.session_state.photo_jobs.values():
+                jobs.cancel(job_id)
+            st.session_state.photo_jobs = {}
             st.rerun()
 
+# 입력 내용이 바뀌었으면 저장
+save_progress()
+
+# 세션 메모리 예산 적용 및 사용량 기록
+session_bytes, _ = enforce_budget(st.session_state)
+ctx = get_script_run_ctx()
+if ctx is not None:
+    memory_ledger.record(ctx.session_id, session_bytes)
+
+# 프로세스 전체 세션 메모리 집계 (1분에 한 번, 가장 많이 쓰는 세션 5개까지)
+memory_report = memory_ledger.report_due()
+if memory_report is not None:
+    top_sessions = sorted(memory_report['per_session'].items(), key=lambda item: -item[1])[:5]
+    log_event('session_memory', sessions=memory_report['sessions'],
+              total_bytes=memory_report['total_bytes'], max_bytes=memory_report['max_bytes'],
+              top_sessions=dict(top_sessions))
+
+# rerun 소요 시간 기록
+log_event('rerun', duration_ms=round((time.perf_counter() - rerun_started) * 1000, 1),
+          session_bytes=session_bytes)
+
 st.markdown("---")
-st.caption("💡 AI 분석은 참고용이며, 실제 유전은 더 복잡할 수 있습
+st.caption("💡 AI 분석은 참고용이며, 실제 유전은 더 복잡할 수 있습니다.")
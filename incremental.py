@@ -0,0 +1,34 @@
+# 형질 단위 증분 재계산
+#
+# 입력 페이지에서 selectbox 하나만 바꿔도 전체 형질을 다시 계산할 필요는 없다.
+# 직전 실행 때의 부모 유전자형을 기억해 두고, 바뀐 형질만 predict_trait로
+# 다시 계산한 뒤 나머지는 이전 결과를 그대로 재사용한다.
+# 세션마다 하나씩 st.session_state에 보관해서 사용한다.
+
+from genetics_engine import parent_genotypes, predict_trait, summarize_predictions
+
+class IncrementalPredictor:
+    """형질별 입력 변화를 추적하여 바뀐 형질만 다시 계산하는 예측기"""
+
+    def __init__(self):
+        self._inputs = {}   # trait_id -> (본인 유전자형, 배우자 유전자형)
+        self._results = {}  # trait_id -> predict_trait 결과
+        self.last_changed = []
+
+    def changed_traits(self, traits, user_data, spouse_data, default=None):
+        """직전 계산 이후 입력이 바뀐 형질 id 목록"""
+        return [
+            t['id'] for t in traits
+            if self._inputs.get(t['id']) != parent_genotypes(t['id'], user_data, spouse_data, default)
+        ]
+
+    def predict(self, traits, user_data, spouse_data, default=None):
+        """predict_children과 같은 형태의 결과를 반환하되 바뀐 형질만 재계산"""
+        self.last_changed = self.changed_traits(traits, user_data, spouse_data, default)
+        for trait_id in self.last_changed:
+            genotypes = parent_genotypes(trait_id, user_data, spouse_data, default)
+            self._inputs[trait_id] = genotypes
+            self._results[trait_id] = predict_trait(*genotypes)
+
+        per_trait = {t['id']: self._results[t['id']] for t in traits}
+        return {'traits': per_trait, 'summary': summarize_predictions(per_trait)}
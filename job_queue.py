@@ -0,0 +1,286 @@
+# 백그라운드 작업 큐
+#
+# 사진 분석, 일괄 예측, 보고서 내보내기처럼 오래 걸리는 작업을 세션 스크립트 스레드에서
+# 직접 돌리지 않고 작업자 풀에 맡긴다. 작업 상태와 결과는 SQLite에 저장되므로
+# UI는 작업을 제출한 뒤 상태를 조회(polling)하다가 끝나면 결과를 가져가기만 하면 된다.
+#
+# - 작업 함수: handler(payload, cancel_event) -> 결과 (pickle 가능한 값)
+#   오래 걸리는 작업은 중간중간 cancel_event.is_set()을 확인해 일찍 끝낼 수 있다.
+# - 사용자(세션)별로 동시에 대기/실행 중인 작업 수를 제한한다.
+# - 여러 프로세스(Streamlit 작업자, 부하 테스트 작업 프로세스 등)가 같은 DB를 함께 쓸 수 있다.
+#   작업마다 제출한 큐 인스턴스(pid + 임의 부팅 id)를 기록하고, 각 인스턴스는 주기적으로
+#   heartbeat를 남긴다. heartbeat가 끊긴(프로세스가 죽은) 인스턴스의 미완료 작업만 실패 처리한다.
+# - 끝난 지 오래된 작업 기록(결과 포함)은 생성할 때와 heartbeat 주기마다 한 번씩 삭제한다.
+#
+# 환경 변수:
+#   GENETICS_JOB_DB       작업 저장소 SQLite 경로
+#   GENETICS_JOB_WORKERS  작업자 스레드 수
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlite_store import connect, create_schema, shared_instance
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.environ.get('GENETICS_JOB_DB', os.path.join(APP_DIR, 'data', 'jobs.sqlite3'))
+DEFAULT_WORKERS = int(os.environ.get('GENETICS_JOB_WORKERS', min(4, os.cpu_count() or 1)))
+DEFAULT_MAX_PER_OWNER = 2
+DEFAULT_RETENTION_SECONDS = 24 * 3600
+HEARTBEAT_SECONDS = 5
+STALE_SECONDS = 30          # 이 시간 동안 heartbeat가 없으면 끝난 인스턴스로 봄
+PURGE_INTERVAL_SECONDS = 3600
+ABANDONED_ERROR = "서버가 다시 시작되어 작업이 중단되었습니다"
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    error TEXT,
+    result BLOB,
+    instance TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_owner_status ON jobs (owner, status);
+CREATE TABLE IF NOT EXISTS instances (
+    id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    started REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+class JobLimitError(RuntimeError):
+    """사용자별 동시 작업 수 제한을 넘었을 때"""
+
+class JobQueue:
+    """SQLite에 상태를 기록하는 작업자 풀 기반 작업 큐"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, workers=DEFAULT_WORKERS,
+                 max_per_owner=DEFAULT_MAX_PER_OWNER, retention_seconds=DEFAULT_RETENTION_SECONDS):
+        self.db_path = db_path
+        self.max_per_owner = max_per_owner
+        self.retention_seconds = retention_seconds
+        self.instance_id = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self._handlers = {}
+        self._cancel_events = {}  # job id -> threading.Event (대기/실행 중인 작업만)
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-worker')
+
+        create_schema(db_path, _SCHEMA)
+        with self._connect() as db:
+            # instance 열이 없던 이전 버전 DB
+            if 'instance' not in [row[1] for row in db.execute("PRAGMA table_info(jobs)")]:
+                db.execute("ALTER TABLE jobs ADD COLUMN instance TEXT")
+        self._heartbeat()
+        self.recover()
+        self.purge()
+
+        self._stop = threading.Event()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name='job-heartbeat', daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def register(self, kind, handler):
+        """작업 종류별 실행 함수 등록 (같은 종류를 다시 등록하면 교체)"""
+        self._handlers[kind] = handler
+
+    # ==========================================
+    # 제출 / 취소
+    # ==========================================
+
+    def submit(self, owner, kind, payload):
+        """
+        작업 제출
+
+        owner: 동시 작업 수를 제한할 단위 (세션 id 등)
+        반환: 작업 id
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"등록되지 않은 작업 종류: {kind}")
+
+        with self._lock:
+            if self.active_count(owner) >= self.max_per_owner:
+                raise JobLimitError(f"동시에 실행할 수 있는 작업은 {self.max_per_owner}개까지입니다")
+
+            job_id = uuid.uuid4().hex
+            with self._connect() as db:
+                db.execute(
+                    "INSERT INTO jobs (id, owner, kind, status, created, instance) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, owner, kind, QUEUED, time.time(), self.instance_id)
+                )
+            cancel = threading.Event()
+            self._cancel_events[job_id] = cancel
+            self._futures[job_id] = self._pool.submit(self._run, job_id, kind, payload, cancel)
+        return job_id
+
+    def cancel(self, job_id):
+        """
+        작업 취소 - 대기 중이면 바로 취소, 실행 중이면 취소 신호를 보냄
+
+        반환: 취소 요청이 받아들여졌는지 여부 (이미 끝난 작업이면 False)
+        """
+        with self._lock:
+            cancel = self._cancel_events.get(job_id)
+            future = self._futures.get(job_id)
+        if cancel is None:
+            return False
+
+        cancel.set()
+        if future is not None and future.cancel():
+            # 작업자가 아직 꺼내지 않은 작업
+            self._finish(job_id, CANCELLED)
+        return True
+
+    # ==========================================
+    # 실행
+    # ==========================================
+
+    def _run(self, job_id, kind, payload, cancel):
+        if cancel.is_set():
+            self._finish(job_id, CANCELLED)
+            return
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, started = ? WHERE id = ? AND status = ?",
+                       (RUNNING, time.time(), job_id, QUEUED))
+        try:
+            result = self._handlers[kind](payload, cancel)
+        except Exception as e:
+            self._finish(job_id, FAILED, error=f"{type(e).__name__}: {e}")
+            return
+        if cancel.is_set():
+            self._finish(job_id, CANCELLED)
+        else:
+            self._finish(job_id, DONE, result=result)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        blob = pickle.dumps(result) if status == DONE else None
+        # 오래 멈춰 있던 사이 다른 인스턴스가 중단 처리한 작업도 실제 결과로 덮어씀
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished = ?, error = ?, result = ? "
+                "WHERE id = ? AND (status IN (?, ?) OR (status = ? AND error = ?))",
+                (status, time.time(), error, blob, job_id) + ACTIVE_STATUSES + (FAILED, ABANDONED_ERROR)
+            )
+        with self._lock:
+            self._cancel_events.pop(job_id, None)
+            self._futures.pop(job_id, None)
+
+    # ==========================================
+    # 조회
+    # ==========================================
+
+    def status(self, job_id):
+        """작업 상태 {'id', 'owner', 'kind', 'status', 'created', 'started', 'finished', 'error'} (없으면 None)"""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, owner, kind, status, created, started, finished, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('id', 'owner', 'kind', 'status', 'created', 'started', 'finished', 'error'), row))
+
+    def result(self, job_id):
+        """끝난 작업의 결과 (끝나지 않았거나 실패/취소된 작업이면 None)"""
+        with self._connect() as db:
+            row = db.execute("SELECT result FROM jobs WHERE id = ? AND status = ?",
+                             (job_id, DONE)).fetchone()
+        return pickle.loads(row[0]) if row and row[0] is not None else None
+
+    def active_count(self, owner):
+        """사용자의 대기/실행 중인 작업 수"""
+        with self._connect() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE owner = ? AND status IN (?, ?)",
+                (owner,) + ACTIVE_STATUSES
+            ).fetchone()[0]
+
+    # ==========================================
+    # 정리
+    # ==========================================
+
+    def _heartbeat(self):
+        """이 인스턴스가 살아 있다고 기록 (다른 인스턴스가 끝난 것으로 보고 지웠으면 다시 등록)"""
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO instances (id, pid, started, heartbeat) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET heartbeat = excluded.heartbeat",
+                (self.instance_id, os.getpid(), now, now)
+            )
+
+    def _heartbeat_loop(self):
+        last_purge = time.time()
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                self._heartbeat()
+                self.recover()
+                if time.time() - last_purge >= PURGE_INTERVAL_SECONDS:
+                    self.purge()
+                    last_purge = time.time()
+            except sqlite3.Error:
+                # DB가 잠깐 잠겨 있어도 다음 주기에 다시 시도
+                continue
+
+    def recover(self):
+        """
+        heartbeat가 끊긴(프로세스가 끝난) 인스턴스가 남긴 미완료 작업을 실패 처리
+
+        다른 프로세스의 작업은 다시 실행할 수 없으므로 실패로 남기고, 끝난 인스턴스 기록은 지운다.
+        반환: 실패 처리한 작업 수
+        """
+        now = time.time()
+        with self._connect() as db:
+            recovered = db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? "
+                "WHERE status IN (?, ?) AND (instance IS NULL OR instance NOT IN "
+                "(SELECT id FROM instances WHERE heartbeat >= ?))",
+                (FAILED, ABANDONED_ERROR, now) + ACTIVE_STATUSES + (now - STALE_SECONDS,)
+            ).rowcount
+            db.execute("DELETE FROM instances WHERE heartbeat < ?", (now - STALE_SECONDS,))
+        return recovered
+
+    def purge(self, max_age_seconds=None):
+        """오래전에 끝난 작업 기록(결과 포함) 삭제, 반환: 삭제한 개수"""
+        if max_age_seconds is None:
+            max_age_seconds = self.retention_seconds
+        with self._connect() as db:
+            return db.execute(
+                "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?",
+                (time.time() - max_age_seconds,)
+            ).rowcount
+
+    def shutdown(self, wait=True):
+        """작업자 풀과 heartbeat를 멈추고, 이 인스턴스의 남은 작업은 실패 처리"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._stop.set()
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE instance = ? AND status IN (?, ?)",
+                (FAILED, ABANDONED_ERROR, time.time(), self.instance_id) + ACTIVE_STATUSES
+            )
+            db.execute("DELETE FROM instances WHERE id = ?", (self.instance_id,))
+
+# 프로세스 전체에서 공유하는 작업 큐 (처음 사용할 때 생성)
+shared_queue = shared_instance(JobQueue)
@@ -0,0 +1,319 @@
+# Streamlit 앱 동시 세션 부하 테스트
+#
+# Streamlit의 AppTest(streamlit.testing.v1)로 앱을 브라우저 없이 실행하면서
+# 여러 세션을 작업 프로세스에서 병렬로 돌려 실제 페이지 흐름을 재현한다.
+#   genetics_app.py            : user -> spouse -> results
+#   genetics_photo_version.py  : 사진 업로드/분석 -> 입력 -> (배우자) -> results
+#     합성 사진을 쓸 때 배우자 사진은 팔레트(PNG-8) 이미지로 올려 RGB가 아닌 업로드도 확인한다.
+# --jobs를 주면 세션 대신 사진 분석 작업(photo_jobs.photo_job)을 한 프로세스의 작업 큐에서
+# 동시에 돌려, 작업자 스레드 사이에 분석기를 공유해 생기는 오류가 없는지 확인한다.
+#
+# 실행 예:
+#   python load_test.py --app genetics_app.py --sessions 200 --concurrency 16
+#   python load_test.py --app genetics_photo_version.py --photo face.jpg
+#   python load_test.py --jobs 32 --concurrency 4
+#
+# 파일 업로드 재현에는 AppTest.file_uploader를 지원하는 Streamlit 버전이 필요하다.
+
+import argparse
+import io
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from job_queue import ACTIVE_STATUSES, DONE, JobQueue
+from photo_jobs import photo_job
+from sample_photo import synthetic_image
+from session_memory import sizeof
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PHOTO_APP = 'genetics_photo_version.py'
+
+# ==========================================
+# 측정 도구
+# ==========================================
+
+def current_rss():
+    """현재 프로세스의 상주 메모리(bytes), /proc이 없으면 최대 RSS로 대체"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # macOS는 bytes, Linux는 KB 단위
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def session_state_size(at):
+    return sizeof(at.session_state.to_dict())
+
+class SessionRecorder:
+    """한 세션의 rerun별 지연 시간과 session_state 크기 기록"""
+
+    def __init__(self, at):
+        self.at = at
+        self.latencies = []  # (페이지, 초)
+        self.state_sizes = []
+
+    def run(self, element=None):
+        page = self.at.session_state.page if 'page' in self.at.session_state else 'start'
+        start = time.perf_counter()
+        (element or self.at).run()
+        self.latencies.append((page, time.perf_counter() - start))
+        self.state_sizes.append(session_state_size(self.at))
+
+        if self.at.exception:
+            raise RuntimeError(f"{page} 페이지 실행 중 예외: {self.at.exception[0].message}")
+
+    def click(self, label_prefix):
+        for button in self.at.button:
+            if button.label.startswith(label_prefix):
+                self.run(button.click())
+                return
+        raise RuntimeError(f"'{label_prefix}' 버튼을 찾을 수 없습니다 ({self.at.session_state.page})")
+
+    def wait_for_button(self, label_prefix, timeout=30.0, interval=0.05):
+        """백그라운드 작업이 끝나 버튼이 나타날 때까지 rerun을 반복 (작업 큐 polling 재현)"""
+        deadline = time.perf_counter() + timeout
+        while not any(button.label.startswith(label_prefix) for button in self.at.button):
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"'{label_prefix}' 버튼이 {timeout:.0f}초 안에 나타나지 않았습니다")
+            time.sleep(interval)
+            self.run()
+
+    def upload(self, role, photo):
+        """해당 역할의 (현재 버전) 업로드 위젯에 사진 설정"""
+        for uploader in self.at.file_uploader:
+            if uploader.key and uploader.key.startswith(f"{role}_photo"):
+                self.run(uploader.set_value(('photo.png', photo, 'image/png')))
+                return
+        raise RuntimeError(f"{role} 업로드 위젯을 찾을 수 없습니다")
+
+    def pick_random(self, role, rng):
+        """해당 역할의 selectbox 중 몇 개를 무작위로 바꿔 입력 변경 재현"""
+        boxes = [box for box in self.at.selectbox if box.key and box.key.startswith(f"{role}_")]
+        for box in rng.sample(boxes, k=min(3, len(boxes))):
+            self.run(box.select_index(rng.randrange(len(box.options))))
+
+# ==========================================
+# 페이지 흐름
+# ==========================================
+
+def basic_flow(rec, rng, photo):
+    rec.run()
+    rec.pick_random('user', rng)
+    rec.click("▶️")
+    rec.pick_random('spouse', rng)
+    rec.click("🎯")
+
+def photo_flow(rec, rng, photo):
+    user_photo, spouse_photo = photo
+    rec.run()
+    rec.upload('user', user_photo)
+    rec.click("🤖")
+    rec.wait_for_button("▶️ 다음 단계")
+    rec.click("▶️ 다음 단계")
+    rec.pick_random('user', rng)
+    rec.click("▶️ 다음 (배우자")
+
+    rec.upload('spouse', spouse_photo)
+    rec.click("🤖")
+    rec.wait_for_button("▶️ 다음 단계")
+    rec.click("▶️ 다음 단계")
+    rec.pick_random('spouse', rng)
+    rec.click("🎯")
+
+def synthetic_photo(size=(640, 800), seed=0, mode='RGB'):
+    """
+    사진이 주어지지 않았을 때 쓰는 잡음 섞인 인물 비슷한 그라데이션 PNG
+
+    mode: 저장할 이미지 모드 ('P'면 팔레트 PNG-8)
+    """
+    image = synthetic_image(size, seed).convert(mode)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+# ==========================================
+# 실행 및 집계
+# ==========================================
+
+# AppTest는 프로세스 전역 런타임을 흉내 내므로 한 프로세스에서 여러 세션을
+# 동시에 돌릴 수 없다. 동시 세션 하나 = 작업 프로세스 하나로 재현한다.
+_worker = {}
+
+def _init_worker(app_path, photo, timeout):
+    """작업 프로세스 초기화 - import/첫 실행 비용을 본 측정에서 분리"""
+    flow = photo_flow if os.path.basename(app_path) == PHOTO_APP else basic_flow
+    _worker.update(app_path=app_path, flow=flow, photo=photo, timeout=timeout)
+    try:
+        run_session(-1)
+    except Exception:
+        pass
+
+def run_session(seed):
+    """세션 하나의 전체 흐름을 실행하고 측정값 반환"""
+    rng = random.Random(seed)
+    rss_before = current_rss()
+    cpu_before = time.process_time()
+
+    at = AppTest.from_file(_worker['app_path'], default_timeout=_worker['timeout'])
+    rec = SessionRecorder(at)
+    error = None
+    try:
+        _worker['flow'](rec, rng, _worker['photo'])
+    except Exception as e:
+        error = str(e)
+
+    return {
+        'latencies': rec.latencies,
+        'state_sizes': rec.state_sizes,
+        'rss_growth': current_rss() - rss_before,
+        'cpu_seconds': time.process_time() - cpu_before,
+        'error': error,
+    }
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    if not values:
+        return {}
+    return {f"p{p}": float(np.percentile(values, p)) * 1000 for p in points}
+
+def run_load(app, sessions, concurrency, photo=None, timeout=60, seed=0):
+    """
+    세션 sessions개를 동시에 concurrency개씩 실행하고 측정값 집계
+
+    photo: 업로드할 사진 bytes (None이면 본인은 RGB, 배우자는 팔레트 합성 사진)
+    반환: {'latency_ms', 'latency_by_page_ms', 'session_state_bytes',
+           'rss_growth_bytes', 'cpu_percent', 'errors', ...}
+    """
+    app_path = app if os.path.isabs(app) else os.path.join(APP_DIR, app)
+    if os.path.basename(app_path) == PHOTO_APP:
+        photo = (photo, photo) if photo is not None else (synthetic_photo(), synthetic_photo(mode='P'))
+
+    with ProcessPoolExecutor(
+        max_workers=concurrency,
+        initializer=_init_worker,
+        initargs=(app_path, photo, timeout)
+    ) as pool:
+        # 모든 작업 프로세스가 준비된 뒤부터 시간 측정
+        list(pool.map(time.sleep, [0] * concurrency))
+        wall_start = time.perf_counter()
+        results = list(pool.map(run_session, range(seed, seed + sessions)))
+        wall = time.perf_counter() - wall_start
+
+    done = [r for r in results if r['error'] is None]
+    errors = [r['error'] for r in results if r['error'] is not None]
+
+    latencies = [seconds for r in results for _, seconds in r['latencies']]
+    by_page = {}
+    for r in results:
+        for page, seconds in r['latencies']:
+            by_page.setdefault(page, []).append(seconds)
+
+    final_sizes = [r['state_sizes'][-1] for r in done if r['state_sizes']]
+    peak_sizes = [max(r['state_sizes']) for r in results if r['state_sizes']]
+    rss_growth = [r['rss_growth'] for r in results]
+    cpu_seconds = sum(r['cpu_seconds'] for r in results)
+
+    return {
+        'sessions': len(done),
+        'reruns': len(latencies),
+        'wall_seconds': wall,
+        'sessions_per_second': len(done) / wall if wall else 0.0,
+        'latency_ms': percentiles(latencies),
+        'latency_by_page_ms': {page: percentiles(values) for page, values in by_page.items()},
+        'session_state_bytes': {
+            'final_mean': float(np.mean(final_sizes)) if final_sizes else 0.0,
+            'peak_max': max(peak_sizes) if peak_sizes else 0,
+        },
+        'rss_growth_bytes': {
+            'mean': float(np.mean(rss_growth)) if rss_growth else 0.0,
+            'max': max(rss_growth) if rss_growth else 0,
+        },
+        'cpu_seconds': cpu_seconds,
+        'cpu_percent': 100 * cpu_seconds / wall if wall else 0.0,
+        'errors': errors,
+    }
+
+def run_job_check(jobs, concurrency, photo=None, timeout=60):
+    """
+    사진 분석 작업 jobs개를 작업자 스레드 concurrency개로 동시에 실행 (단일 사진/단체 사진 번갈아)
+
+    임시 DB를 쓰는 별도 작업 큐에서 돌리므로 앱의 작업 기록에 섞이지 않는다.
+    반환: {'jobs', 'wall_seconds', 'errors': [실패/시간 초과 사유, ...]}
+    """
+    photos = [photo] if photo is not None else [synthetic_photo(seed=i) for i in range(concurrency)]
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.sqlite3'), workers=concurrency, max_per_owner=jobs)
+        queue.register('photo', photo_job)
+        wall_start = time.perf_counter()
+        ids = [
+            queue.submit('load-test', 'photo', {'photo': photos[i % len(photos)], 'group': i % 2 == 1})
+            for i in range(jobs)
+        ]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            statuses = [queue.status(job_id) for job_id in ids]
+            if all(job['status'] not in ACTIVE_STATUSES for job in statuses):
+                break
+            time.sleep(0.05)
+        wall = time.perf_counter() - wall_start
+        queue.shutdown()
+
+    errors = [
+        job['error'] or f"시간 초과 ({job['status']})" for job in statuses if job['status'] != DONE
+    ]
+    return {'jobs': jobs, 'wall_seconds': wall, 'errors': errors}
+
+def print_report(report):
+    print(f"세션 {report['sessions']}개, rerun {report['reruns']}회, "
+          f"{report['wall_seconds']:.1f}초 ({report['sessions_per_second']:.2f} 세션/초)")
+    print("rerun 지연(ms): " + ", ".join(f"{k}={v:.1f}" for k, v in report['latency_ms'].items()))
+    for page, values in report['latency_by_page_ms'].items():
+        print(f"  {page:>14}: " + ", ".join(f"{k}={v:.1f}" for k, v in values.items()))
+    state = report['session_state_bytes']
+    print(f"세션 상태 크기: 평균 {state['final_mean'] / 1024:.1f} KB, 최대 {state['peak_max'] / 1024:.1f} KB")
+    rss = report['rss_growth_bytes']
+    print(f"세션당 RSS 증가: 평균 {rss['mean'] / 2**20:.1f} MB, 최대 {rss['max'] / 2**20:.1f} MB")
+    print(f"CPU: {report['cpu_seconds']:.1f}초 ({report['cpu_percent']:.0f}%, 코어 {os.cpu_count()}개)")
+    if report['errors']:
+        print(f"오류 {len(report['errors'])}건, 예: {report['errors'][0]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="유전 형질 예측 앱 동시 세션 부하 테스트")
+    parser.add_argument('--app', default='genetics_app.py')
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--photo', help="업로드할 사진 파일 (없으면 합성 이미지 사용)")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, help="세션 대신 사진 분석 작업을 이만큼 동시에 실행")
+    args = parser.parse_args()
+
+    photo = None
+    if args.photo:
+        with open(args.photo, 'rb') as f:
+            photo = f.read()
+
+    if args.jobs:
+        report = run_job_check(args.jobs, args.concurrency, photo, args.timeout)
+        print(f"사진 분석 작업 {report['jobs']}개, 작업자 {args.concurrency}개, {report['wall_seconds']:.1f}초")
+        if report['errors']:
+            print(f"오류 {len(report['errors'])}건, 예: {report['errors'][0]}")
+        return 1 if report['errors'] else 0
+
+    report = run_load(args.app, args.sessions, args.concurrency, photo, args.timeout, args.seed)
+    print_report(report)
+    return 1 if report['errors'] else 0
+
+if __name__ == '__main__':
+    # AppTest가 작업 프로세스의 __main__을 앱 스크립트로 바꿔 치우므로
+    # 작업 함수가 'load_test' 모듈 이름으로 pickle되도록 모듈로 다시 import
+    import load_test
+    sys.exit(load_test.main())
@@ -0,0 +1,353 @@
+# 사진 분석 함수들
+#
+# genetics_photo_version.py에서 사용하는 형질 자동 인식 로직.
+# Streamlit에 의존하지 않으므로 배치 작업에서도 그대로 불러 쓸 수 있다.
+
+import threading
+
+import cv2
+import numpy as np
+
+from color_lut import HAIR, SKIN, label_pixels
+from photo_features import MEASUREMENT_NAMES
+
+# 라벨링된 픽셀이 이보다 적으면 영역 전체 평균으로 대체
+MIN_LABELLED_PIXELS = 50
+
+# 측정값 -> 유전자형 경계 (경계값, 값이 작은 쪽부터의 유전자형, 경계 부근 폭)
+# 폭은 경계에서 이만큼 떨어지면 약 73%, 세 배 떨어지면 약 95% 확신하는 정도
+HAIR_BRIGHTNESS_LEVELS = ([100, 150], ['DD', 'Dd', 'dd'], 10.0)
+CURL_SCORE_LEVELS = ([0.15, 0.35], ['dd', 'Dd', 'DD'], 0.04)
+SKIN_BRIGHTNESS_LEVELS = ([100, 160], ['dark', 'medium', 'light'], 10.0)
+
+def soft_classify(value, thresholds, labels, width):
+    """
+    경계값 분류를 확률로 - 경계 근처에서는 양쪽 유전자형에 확률을 나눠 준다
+
+    순서형 로지스틱: P(값이 k번째 경계보다 큼) = sigmoid((값 - 경계) / 폭)
+    반환: {genotype: 확률}
+    """
+    above = 1 / (1 + np.exp(-(value - np.asarray(thresholds, dtype=float)) / width))
+    cumulative = np.concatenate([[1.0], above, [0.0]])
+    return {label: float(p) for label, p in zip(labels, cumulative[:-1] - cumulative[1:])}
+
+def to_rgb_array(image):
+    """PIL 이미지(RGBA, 흑백 포함)를 RGB uint8 배열로 변환 (이미 배열이면 그대로)"""
+    if isinstance(image, np.ndarray):
+        return image
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image)
+
+def analyze_hair_color(image, labels=None):
+    """
+    사진에서 머리카락 색 분석
+
+    labels: 미리 계산한 label_pixels 결과 (없으면 계산)
+    반환: 'DD', 'Dd', 'dd'
+    """
+    return classify_hair_brightness(hair_brightness(image, labels))
+
+def hair_brightness(image, labels=None):
+    """상단 절반에서 색상 LUT가 머리카락으로 분류한 픽셀의 평균 밝기(HSV의 V)"""
+    rgb = to_rgb_array(image)
+    if labels is None:
+        labels = label_pixels(rgb)
+
+    # 상단 절반 영역 (머리 영역 추정)
+    height = rgb.shape[0]
+    region = rgb[0:height // 2]
+    hair = labels[0:height // 2] == HAIR
+
+    # V 채널 = RGB 중 최댓값
+    brightness = region.max(axis=2)
+    if np.count_nonzero(hair) >= MIN_LABELLED_PIXELS:
+        avg_brightness = brightness[hair].mean()
+    else:
+        avg_brightness = brightness[0:int(height*0.3)].mean()
+    return float(avg_brightness)
+
+def classify_hair_brightness(avg_brightness):
+    """머리카락 평균 밝기 -> 'DD', 'Dd', 'dd'"""
+    if avg_brightness > 150:  # 밝은 머리 (금발/적발)
+        return 'dd'
+    elif avg_brightness > 100:  # 중간 (혼합 가능성)
+        return 'Dd'
+    else:  # 어두운 머리
+        return 'DD'
+
+# ==========================================
+# 얼굴 검출
+# ==========================================
+
+# CascadeClassifier는 여러 스레드가 동시에 detectMultiScale을 호출하면 안전하지 않으므로
+# 작업 큐의 작업자 스레드마다 따로 로드해 재사용한다
+_local = threading.local()
+
+def load_face_cascade():
+    """OpenCV Haar cascade 얼굴 검출 모델을 스레드마다 한 번만 로드해 재사용"""
+    cascade = getattr(_local, 'face_cascade', None)
+    if cascade is None:
+        cascade = _local.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+    return cascade
+
+def detect_faces(gray, min_size=24):
+    """
+    흑백 이미지에서 정면 얼굴 검출 (OpenCV Haar cascade, 스레드마다 처음 호출 때 한 번만 로드)
+
+    반환: [(x, y, w, h), ...] 큰 얼굴부터
+    """
+    faces = load_face_cascade().detectMultiScale(
+        gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size)
+    )
+    return sorted((tuple(int(v) for v in face) for face in faces), key=lambda f: -f[2] * f[3])
+
+# 머리카락 질감 분석용 고정 크기 ROI와 주파수 격자 (한 번만 계산)
+TEXTURE_SIZE = 128
+MIN_TEXTURE_CONTRAST = 4.0  # 고주파 성분의 밝기 표준편차가 이보다 작으면 질감 없음
+
+_texture_window = np.outer(np.hanning(TEXTURE_SIZE), np.hanning(TEXTURE_SIZE)).astype(np.float32)
+_freq_y = np.fft.fftfreq(TEXTURE_SIZE)[:, None]
+_freq_x = np.fft.rfftfreq(TEXTURE_SIZE)[None, :]
+_radius = np.hypot(_freq_x, _freq_y)
+_angle = np.arctan2(_freq_y, _freq_x)
+_band = _radius >= 0.02    # 조명 변화 같은 아주 낮은 주파수 제외
+_high = _radius >= 0.12    # 머리카락 가닥 수준의 고주파
+_cos2 = np.cos(2 * _angle)[_high]
+_sin2 = np.sin(2 * _angle)[_high]
+
+def texture_roi(rgb, size=TEXTURE_SIZE):
+    """
+    상단 30% 머리 영역을 size x size 흑백으로 축소
+
+    먼저 간격을 두고 건너뛰며 읽은 뒤 축소하므로 입력 해상도와 무관하게 비용이 거의 일정하다.
+    """
+    height = rgb.shape[0]
+    region = rgb[0:max(1, int(height*0.3))]
+    step = max(1, min(region.shape[0], region.shape[1]) // (2 * size))
+    region = np.ascontiguousarray(region[::step, ::step])
+    gray = cv2.cvtColor(region, cv2.COLOR_RGB2GRAY)
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+
+def hair_texture_features(roi):
+    """
+    ROI의 방향성 고주파 에너지 특징
+
+    반환: (고주파 비율, 방향 집중도, 곱슬 점수)
+      - 고주파 비율: 전체 에너지 중 가닥 수준 고주파의 비율
+      - 방향 집중도: 고주파 에너지가 한 방향에 몰린 정도 (0 = 등방, 1 = 한 방향)
+      - 곱슬 점수: 고주파 비율 x (1 - 방향 집중도). 직모는 한 방향으로 결이 생겨 낮다
+    """
+    return tuple(float(v) for v in hair_texture_features_batch([roi])[0])
+
+def hair_texture_features_batch(rois):
+    """
+    여러 ROI의 질감 특징을 한 번의 FFT 호출로 계산
+
+    반환: (N, 3) 배열 - 행마다 hair_texture_features와 같은 (고주파 비율, 방향 집중도, 곱슬 점수)
+    """
+    rois = np.asarray(rois, dtype=np.float32).reshape(-1, TEXTURE_SIZE, TEXTURE_SIZE)
+    features = np.zeros((len(rois), 3))
+
+    # 잡음 수준의 잔결만 있는 매끈한 영역은 비율이 커도 질감으로 보지 않음
+    detail = np.array([(roi - cv2.GaussianBlur(roi, (0, 0), 1.5)).std() for roi in rois])
+    textured = detail >= MIN_TEXTURE_CONTRAST
+    if not textured.any():
+        return features
+
+    rois = rois[textured]
+    rois = rois - rois.mean(axis=(1, 2), keepdims=True)
+    power = np.abs(np.fft.rfft2(rois * _texture_window)) ** 2
+    high = power[:, _high]
+    high_sum = high.sum(axis=1)
+    high_ratio = high_sum / power[:, _band].sum(axis=1)
+    anisotropy = np.hypot(high @ _cos2, high @ _sin2) / high_sum
+    features[textured] = np.stack([high_ratio, anisotropy, high_ratio * (1 - anisotropy)], axis=1)
+    return features
+
+def analyze_hair_texture(image):
+    """
+    사진에서 머리카락 모양 분석 (직모/곱슬)
+
+    고정 크기로 축소한 머리 영역의 FFT로 방향성 고주파 에너지를 측정한다.
+    해상도가 달라도 같은 기준으로 비교된다.
+    반환: 'DD', 'Dd', 'dd'
+    """
+    return classify_curl_score(curl_score(image))
+
+def curl_score(image):
+    """머리 영역의 곱슬 점수 (hair_texture_features 참고)"""
+    return hair_texture_features(texture_roi(to_rgb_array(image)))[2]
+
+def classify_curl_score(curl_score):
+    """곱슬 점수 -> 'DD', 'Dd', 'dd'"""
+    if curl_score > 0.35:  # 여러 방향의 잔결 = 곱슬
+        return 'DD'
+    elif curl_score > 0.15:
+        return 'Dd'
+    else:  # 한 방향 결 또는 질감 없음 = 직모
+        return 'dd'
+
+def analyze_skin_tone(image, labels=None):
+    """
+    사진에서 피부색 분석
+
+    labels: 미리 계산한 label_pixels 결과 (없으면 계산)
+    반환: 'dark', 'medium', 'light'
+    """
+    return classify_skin_brightness(skin_brightness(image, labels))
+
+def skin_brightness(image, labels=None):
+    """얼굴 중앙 영역에서 색상 LUT가 피부로 분류한 픽셀의 평균 밝기"""
+    rgb = to_rgb_array(image)
+    if labels is None:
+        labels = label_pixels(rgb)
+
+    # 얼굴 중앙 영역 추출 (간단한 방법)
+    height, width = rgb.shape[:2]
+    rows = slice(int(height*0.3), int(height*0.7))
+    cols = slice(int(width*0.3), int(width*0.7))
+    face_region = rgb[rows, cols]
+    skin = labels[rows, cols] == SKIN
+
+    # RGB 평균값 계산
+    if np.count_nonzero(skin) >= MIN_LABELLED_PIXELS:
+        avg_color = face_region[skin].mean(axis=0)
+    else:
+        avg_color = np.mean(face_region, axis=(0, 1))
+    return float(np.mean(avg_color))
+
+def classify_skin_brightness(brightness):
+    """피부 평균 밝기 -> 'dark', 'medium', 'light'"""
+    if brightness < 100:
+        return 'dark'
+    elif brightness < 160:
+        return 'medium'
+    else:
+        return 'light'
+
+def analyze_traits(image, probabilistic=False):
+    """
+    자동 인식 가능한 형질을 모두 분석 - 픽셀 라벨링은 한 번만 수행
+
+    probabilistic: True면 경계값 근처의 애매함을 살린 혼합 유전자형 반환
+    반환: {trait_id: genotype} 또는 {trait_id: {genotype: 확률}}
+    """
+    return classify_measurements(*measure_traits(image).values(), probabilistic=probabilistic)
+
+def measure_traits(image):
+    """자동 인식 형질의 측정값 {측정값 이름: 값} - 픽셀 라벨링은 한 번만 수행"""
+    rgb = to_rgb_array(image)
+    labels = label_pixels(rgb)
+    values = (hair_brightness(rgb, labels), curl_score(rgb), skin_brightness(rgb, labels))
+    return dict(zip(MEASUREMENT_NAMES, values))
+
+def classify_measurements(hair_value, curl_value, skin_value, probabilistic=False):
+    """세 측정값을 유전자형(또는 혼합 유전자형) 딕셔너리로"""
+    if probabilistic:
+        return {
+            'hair_color': soft_classify(hair_value, *HAIR_BRIGHTNESS_LEVELS),
+            'hair_texture': soft_classify(curl_value, *CURL_SCORE_LEVELS),
+            'skin': soft_classify(skin_value, *SKIN_BRIGHTNESS_LEVELS),
+        }
+    return {
+        'hair_color': classify_hair_brightness(hair_value),
+        'hair_texture': classify_curl_score(curl_value),
+        'skin': classify_skin_brightness(skin_value),
+    }
+
+# ==========================================
+# 단체 사진 (여러 얼굴 한 번에)
+# ==========================================
+
+GROUP_DETECT_SIZE = 800  # 얼굴 검출용 축소 이미지의 긴 변
+MAX_GROUP_FACES = 12     # 한 사진에서 분석할 최대 얼굴 수 (큰 얼굴부터)
+
+def find_faces(rgb, detect_size=GROUP_DETECT_SIZE):
+    """
+    축소한 흑백 이미지에서 얼굴을 찾아 원본 좌표로 반환
+
+    반환: [(x, y, w, h), ...] 큰 얼굴부터
+    """
+    height, width = rgb.shape[:2]
+    scale = min(1.0, detect_size / max(height, width))
+    small = rgb
+    if scale < 1.0:
+        small = cv2.resize(rgb, (max(1, int(width*scale)), max(1, int(height*scale))),
+                           interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(np.ascontiguousarray(small), cv2.COLOR_RGB2GRAY)
+    faces = detect_faces(gray)[:MAX_GROUP_FACES]
+    return [tuple(int(round(v / scale)) for v in face) for face in faces]
+
+def face_regions(face, shape):
+    """
+    얼굴 상자 기준 머리카락/피부 영역
+
+    - 머리카락: 얼굴 위쪽 절반 높이부터 이마까지, 양옆으로 조금 넓게
+    - 피부: 눈 아래 볼~코 부분
+    반환: (머리카락 (행 slice, 열 slice), 피부 (행 slice, 열 slice))
+    """
+    x, y, w, h = face
+    height, width = shape[:2]
+
+    def box(top, bottom, left, right):
+        rows = slice(max(0, int(top)), max(1, min(height, int(bottom))))
+        cols = slice(max(0, int(left)), max(1, min(width, int(right))))
+        return rows, cols
+
+    hair = box(y - 0.5*h, y + 0.25*h, x - 0.15*w, x + 1.15*w)
+    skin = box(y + 0.45*h, y + 0.75*h, x + 0.25*w, x + 0.75*w)
+    return hair, skin
+
+def analyze_faces(image, faces=None):
+    """
+    사진 속 모든 얼굴의 형질을 한 번에 분석
+
+    픽셀 라벨, 흑백 변환은 전체 이미지에서 한 번만 하고 얼굴마다 영역만 잘라 쓴다.
+    머리카락 질감 FFT도 모든 얼굴의 ROI를 모아 한 번에 계산한다.
+    faces: 이미 찾은 얼굴 상자 목록 (없으면 검출)
+    반환: [{'box': (x, y, w, h), 'traits': {trait_id: genotype},
+            'probs': {trait_id: {genotype: 확률}},
+            'features': {측정값 이름: 값}}, ...] 큰 얼굴부터
+    """
+    rgb = to_rgb_array(image)
+    if faces is None:
+        faces = find_faces(rgb)
+    if not faces:
+        return []
+
+    labels = label_pixels(rgb)
+    brightness = rgb.max(axis=2)  # V 채널
+    gray = cv2.cvtColor(np.ascontiguousarray(rgb), cv2.COLOR_RGB2GRAY)
+
+    measurements, rois = [], []
+    for face in faces:
+        hair, skin = face_regions(face, rgb.shape)
+
+        hair_pixels = labels[hair] == HAIR
+        if np.count_nonzero(hair_pixels) >= MIN_LABELLED_PIXELS:
+            hair_value = brightness[hair][hair_pixels].mean()
+        else:
+            hair_value = brightness[hair].mean()
+
+        skin_pixels = labels[skin] == SKIN
+        if np.count_nonzero(skin_pixels) >= MIN_LABELLED_PIXELS:
+            skin_value = rgb[skin][skin_pixels].mean()
+        else:
+            skin_value = rgb[skin].mean()
+
+        rois.append(cv2.resize(gray[hair], (TEXTURE_SIZE, TEXTURE_SIZE), interpolation=cv2.INTER_AREA))
+        measurements.append((float(hair_value), float(skin_value)))
+
+    curl_values = hair_texture_features_batch(rois)[:, 2]
+    return [
+        {
+            'box': face,
+            'traits': classify_measurements(hair_value, curl_value, skin_value),
+            'probs': classify_measurements(hair_value, curl_value, skin_value, probabilistic=True),
+            'features': dict(zip(MEASUREMENT_NAMES, (hair_value, float(curl_value), skin_value))),
+        }
+        for face, (hair_value, skin_value), curl_value in zip(faces, measurements, curl_values)
+    ]
@@ -0,0 +1,8 @@
+# 사진 측정값 정의
+#
+# photo_analysis가 얼굴/사진마다 계산하는 측정값 이름과 순서.
+# 열 형식 내보내기(columnar_export)처럼 측정값 열만 필요한 곳이
+# OpenCV를 불러오지 않고도 쓸 수 있도록 분석 코드와 분리해 둔다.
+
+# measure_traits, analyze_faces 결과의 'features' 키 순서 (classify_measurements 인자 순서와 같음)
+MEASUREMENT_NAMES = ('hair_brightness', 'curl_score', 'skin_brightness')
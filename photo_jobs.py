@@ -0,0 +1,62 @@
+# 사진 분석 작업
+#
+# genetics_photo_version.py가 작업 큐(job_queue)에 맡기는 작업 함수.
+# 작업자 스레드 여러 개에서 동시에 실행되므로 Streamlit을 호출하지 않고,
+# 스레드 사이에 공유하면 안 되는 분석기(OpenCV cascade 등)는 photo_analysis가 스레드마다 따로 둔다.
+# 부하 테스트(load_test --jobs)도 같은 함수를 그대로 동시에 돌려 본다.
+
+import io
+import time
+
+from PIL import Image
+
+from photo_analysis import analyze_faces, analyze_traits
+from photo_quality import check_quality
+from session_memory import make_thumbnail
+
+FACE_THUMBNAIL_SIZE = 96
+
+def photo_job(payload, cancel):
+    """
+    사진 분석 작업 - 작업 큐의 작업자 스레드에서 실행되므로 Streamlit을 호출하지 않음
+    
+    먼저 작은 썸네일로 품질을 검사해 흐리거나 어둡거나 작은 사진은 분석하지 않는다.
+    경계값 근처의 애매한 사진도 한쪽으로 단정하지 않도록 혼합 유전자형으로 돌려준다.
+    payload: {'photo': 업로드 파일 bytes, 'group': 단체 사진 여부}
+    반환: {'quality', 'quality_ms', 'duration_ms', 'width', 'height', 'thumbnail',
+           'traits': {trait_id: {genotype: 확률}} 또는 'faces': [{'traits', 'thumbnail'}, ...]}
+    """
+    started = time.perf_counter()
+    # 품질 검사는 JPEG을 줄여 디코딩(draft)하므로 분석용과 따로 열어서 넘김
+    quality = check_quality(Image.open(io.BytesIO(payload['photo'])))
+    image = Image.open(io.BytesIO(payload['photo']))
+    result = {
+        'quality': quality,
+        'quality_ms': round((time.perf_counter() - started) * 1000, 1),
+        'width': image.width,
+        'height': image.height,
+    }
+    if not quality['ok'] or cancel.is_set():
+        return result
+    
+    if payload['group']:
+        result['faces'] = [
+            {
+                'traits': face['probs'],
+                'thumbnail': make_thumbnail(
+                    image.crop(face_crop_box(face['box'], image.size)), FACE_THUMBNAIL_SIZE
+                ),
+            }
+            for face in analyze_faces(image)
+        ]
+    else:
+        result['traits'] = analyze_traits(image, probabilistic=True)
+    result['thumbnail'] = make_thumbnail(image)
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+def face_crop_box(box, size):
+    """얼굴 상자를 머리카락까지 보이도록 넓힌 PIL crop 좌표"""
+    x, y, w, h = box
+    width, height = size
+    return (max(0, x - w // 4), max(0, y - h // 2), min(width, x + w + w // 4), min(height, y + h + h // 4))
@@ -0,0 +1,105 @@
+# 사진 품질 사전 검사
+#
+# 어둡거나 흐리거나 너무 작은 사진은 분석해도 그럴듯하지만 의미 없는 유전자형이 나온다.
+# 원본 해상도로 분석하기 전에 작은 흑백 썸네일에서 선명도, 노출, 얼굴 크기를
+# 수 밀리초 안에 측정해 나쁜 사진은 거절하고, 애매한 사진은 경고와 함께 통과시킨다.
+# JPEG은 draft 모드로 디코딩 단계에서부터 줄여 읽으므로 원본 해상도 디코딩을 하지 않는다.
+
+import cv2
+import numpy as np
+
+from photo_analysis import detect_faces
+
+QUALITY_SIZE = 320            # 검사용 썸네일 긴 변 (픽셀)
+MIN_SIDE = 200                # 원본 짧은 변이 이보다 작으면 거절
+MIN_SHARPNESS = 30.0          # 썸네일 라플라시안 분산이 이보다 작으면 흐림
+MIN_BRIGHTNESS = 40           # 평균 밝기 (0~255)
+MAX_BRIGHTNESS = 220
+MAX_CLIPPED_FRACTION = 0.4    # 완전히 검거나 흰 픽셀 비율이 이보다 크면 경고
+MIN_FACE_FRACTION = 0.2       # 가장 큰 얼굴 너비 / 썸네일 너비
+
+# 그대로 reduce할 수 있는 모드 - 팔레트(P, PA)는 색 번호를 평균 내게 되고 1, I;16은
+# reduce가 지원하지 않으므로 나머지 모드는 먼저 흑백으로 바꾼다
+REDUCE_MODES = ('L', 'LA', 'RGB', 'RGBA')
+
+# 문제 코드 -> (거절 여부, 안내 문구)
+QUALITY_MESSAGES = {
+    'too_small': (True, "사진 해상도가 너무 낮습니다. 더 큰 사진을 올려주세요."),
+    'blurry': (True, "사진이 흐립니다. 초점이 맞은 사진을 올려주세요."),
+    'too_dark': (True, "사진이 너무 어둡습니다. 밝은 곳에서 찍은 사진을 올려주세요."),
+    'too_bright': (True, "사진이 너무 밝습니다. 역광이나 과노출을 피해주세요."),
+    'clipped': (False, "너무 어둡거나 하얗게 날아간 부분이 많아 결과가 부정확할 수 있습니다."),
+    'no_face': (False, "얼굴을 찾지 못했습니다. 정면 얼굴이 나온 사진이면 더 정확합니다."),
+    'small_face': (False, "얼굴이 작게 나왔습니다. 얼굴이 크게 나온 사진이면 더 정확합니다."),
+}
+
+def quality_thumbnail(image, size=QUALITY_SIZE):
+    """
+    PIL 이미지를 검사용 흑백 썸네일 배열로 축소
+
+    아직 디코딩하지 않은 JPEG은 draft로 흑백, 1/2~1/8 크기로 바로 디코딩한다.
+    draft는 image 자체를 바꾸므로 원본 해상도가 필요한 곳에는 따로 연 이미지를 넘긴다.
+    그 밖의 형식은 reduce가 새 이미지를 만들므로 원본이 바뀌지 않는다.
+    """
+    image.draft('L', (size, size))
+    if image.mode not in REDUCE_MODES:
+        image = image.convert('L')
+    factor = max(1, max(image.size) // size)
+    small = image.reduce(factor) if factor > 1 else image
+    return np.asarray(small.convert('L'))
+
+def check_quality(image):
+    """
+    분석 전 사진 품질 검사
+
+    JPEG은 draft 모드로 줄여 읽으므로 검사 뒤 image는 작아져 있다 (quality_thumbnail 참고).
+    반환: {'sharpness', 'brightness', 'dark_fraction', 'bright_fraction',
+           'face_count', 'face_fraction', 'issues': [코드, ...], 'ok': 거절 사유 없음 여부}
+    """
+    # 해상도 검사는 draft로 줄이기 전 원본 크기 기준
+    original_size = image.size
+    gray = quality_thumbnail(image)
+    issues = []
+
+    if min(original_size) < MIN_SIDE:
+        issues.append('too_small')
+
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    if sharpness < MIN_SHARPNESS:
+        issues.append('blurry')
+
+    # 노출: 256칸 히스토그램 한 번으로 평균과 양 끝 비율 계산
+    hist = np.bincount(gray.ravel(), minlength=256) / gray.size
+    brightness = float(hist @ np.arange(256))
+    dark_fraction = float(hist[:6].sum())
+    bright_fraction = float(hist[250:].sum())
+    if brightness < MIN_BRIGHTNESS:
+        issues.append('too_dark')
+    elif brightness > MAX_BRIGHTNESS:
+        issues.append('too_bright')
+    elif dark_fraction + bright_fraction > MAX_CLIPPED_FRACTION:
+        issues.append('clipped')
+
+    faces = detect_faces(gray)
+    face_fraction = faces[0][2] / gray.shape[1] if faces else 0.0
+    if not faces:
+        issues.append('no_face')
+    elif face_fraction < MIN_FACE_FRACTION:
+        issues.append('small_face')
+
+    return {
+        'sharpness': sharpness,
+        'brightness': brightness,
+        'dark_fraction': dark_fraction,
+        'bright_fraction': bright_fraction,
+        'face_count': len(faces),
+        'face_fraction': float(face_fraction),
+        'issues': issues,
+        'ok': not any(QUALITY_MESSAGES[code][0] for code in issues),
+    }
+
+def quality_messages(quality):
+    """검사 결과의 (거절 문구 목록, 경고 문구 목록)"""
+    rejected = [QUALITY_MESSAGES[c][1] for c in quality['issues'] if QUALITY_MESSAGES[c][0]]
+    warnings = [QUALITY_MESSAGES[c][1] for c in quality['issues'] if not QUALITY_MESSAGES[c][0]]
+    return rejected, warnings
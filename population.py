@@ -0,0 +1,157 @@
+# 집단 대립유전자 빈도 분석
+#
+# 형질 id 순서(trait_registry 레지스트리의 ids)로 정렬된 유전자형 코드 배열(genetics_engine.GENOTYPE_CODES)을
+# 청크 단위로 읽어 형질별 유전자형 빈도, 대립유전자 빈도, 하디-바인베르크
+# 기대값과 적합도, 무작위 교배 시 자녀 분포를 계산한다.
+# 수천만 행도 np.memmap 이나 청크 iterator 로 넘기면 메모리에 다 올리지 않는다.
+#
+# 다인자 형질(키, 피부색)의 코드 0/1/2는 두 대립유전자의 유전자형이 아니라 결과 구간이므로
+# 대립유전자 빈도와 하디-바인베르크 값은 NaN으로 두고, 개수와 자녀 분포만 계산한다.
+
+import math
+
+import numpy as np
+
+from genetics_engine import N_GENOTYPES, encode_genotypes, is_polygenic, offspring_tables, trait_ids
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# ==========================================
+# 입력 읽기
+# ==========================================
+
+def open_genotype_memmap(path, n_traits):
+    """
+    int8 유전자형 코드가 행 단위로 저장된 바이너리 파일을 memmap으로 열기
+
+    반환: (행 수, 형질 수) 읽기 전용 np.memmap
+    """
+    data = np.memmap(path, dtype=np.int8, mode='r')
+    return data.reshape(-1, n_traits)
+
+def iter_chunks(source, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """배열/memmap은 행 단위로 잘라서, 그 외 iterable은 그대로 청크를 반환"""
+    if isinstance(source, np.ndarray):
+        for start in range(0, source.shape[0], chunk_rows):
+            yield source[start:start + chunk_rows]
+    else:
+        for chunk in source:
+            yield np.asarray(chunk)
+
+# ==========================================
+# 빈도 계산
+# ==========================================
+
+def genotype_counts(codes):
+    """
+    한 청크의 형질별 유전자형 개수
+
+    반환: (형질 수, 3) int64 배열 - [t, 유전자형 코드]
+    """
+    n_traits = codes.shape[1]
+    offsets = np.arange(n_traits, dtype=np.int64) * N_GENOTYPES
+    flat = (codes.astype(np.int64) + offsets).ravel()
+    counts = np.bincount(flat, minlength=n_traits * N_GENOTYPES)
+    return counts.reshape(n_traits, N_GENOTYPES)
+
+def accumulate_counts(source, n_traits, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """청크를 순회하며 형질별 유전자형 개수를 누적"""
+    total = np.zeros((n_traits, N_GENOTYPES), dtype=np.int64)
+    for chunk in iter_chunks(source, chunk_rows):
+        total += genotype_counts(chunk)
+    return total
+
+def genotype_frequencies(counts):
+    """유전자형 개수를 형질별 빈도(합 1)로 정규화"""
+    counts = np.asarray(counts, dtype=np.float64)
+    return counts / counts.sum(axis=1, keepdims=True)
+
+def polygenic_mask(traits):
+    """다인자 형질 여부 (형질 수,) bool 배열"""
+    return np.array([is_polygenic(trait) for trait in traits], dtype=bool)
+
+def allele_frequencies(counts, traits=None):
+    """
+    형질별 우성(높은 쪽) 대립유전자 빈도 p
+
+    traits: 주면 다인자 형질은 NaN (대립유전자 두 개로 나타낼 수 없음)
+    반환: (형질 수,) 배열. 열성 대립유전자 빈도는 1 - p
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    n = counts.sum(axis=1)
+    p = (2 * counts[:, 0] + counts[:, 1]) / (2 * n)
+    if traits is not None:
+        p[polygenic_mask(traits)] = np.nan
+    return p
+
+def hardy_weinberg(counts, traits=None):
+    """
+    하디-바인베르크 기대 유전자형 개수와 카이제곱 적합도 검정 (자유도 1)
+
+    traits: 주면 다인자 형질의 기대 개수, 카이제곱, p-value는 NaN
+    반환: (기대 개수 (형질 수, 3), 카이제곱 (형질 수,), p-value (형질 수,))
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    n = counts.sum(axis=1)
+    p = allele_frequencies(counts, traits)
+    q = 1 - p
+    expected = np.stack([p * p, 2 * p * q, q * q], axis=1) * n[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(np.isnan(expected) | (expected > 0), (counts - expected) ** 2 / expected, 0.0)
+    chi2 = terms.sum(axis=1)
+    # 자유도 1 카이제곱 분포의 생존 함수
+    p_values = np.array([math.erfc(math.sqrt(x / 2)) for x in chi2])
+    return expected, chi2, p_values
+
+# ==========================================
+# 무작위 교배 자녀 분포
+# ==========================================
+
+def random_mating_offspring(counts, traits):
+    """
+    집단에서 무작위로 뽑힌 두 부모 사이 자녀의 형질별 분포
+
+    반환: (형질 수, 3) 배열 - [t, 자녀 코드]
+    """
+    freqs = genotype_frequencies(counts)
+    tables = offspring_tables(traits)
+    return np.einsum('ti,tj,tijk->tk', freqs, freqs, tables)
+
+def partner_from_population(parent, counts, traits):
+    """
+    한쪽 부모는 고정, 배우자는 집단에서 무작위로 뽑을 때 자녀의 형질별 분포
+
+    parent: {trait_id: genotype}
+    반환: (형질 수, 3) 배열 - [t, 자녀 코드]
+    """
+    parent_codes = encode_genotypes([parent], trait_ids(traits))[0]
+    freqs = genotype_frequencies(counts)
+    tables = offspring_tables(traits)
+    rows = tables[np.arange(len(traits)), parent_codes]
+    return np.einsum('tj,tjk->tk', freqs, rows)
+
+def summarize_population(source, traits, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    집단 유전자형 데이터를 한 번 순회하여 형질별 요약 계산
+
+    반환: {trait_id: {'counts', 'allele_freq', 'hw_expected', 'chi2',
+                      'p_value', 'offspring'}}
+          (다인자 형질은 'allele_freq'부터 'p_value'까지 NaN)
+    """
+    counts = accumulate_counts(source, len(traits), chunk_rows)
+    p = allele_frequencies(counts, traits)
+    expected, chi2, p_values = hardy_weinberg(counts, traits)
+    offspring = random_mating_offspring(counts, traits)
+
+    summary = {}
+    for t, trait in enumerate(traits):
+        summary[trait['id']] = {
+            'counts': counts[t],
+            'allele_freq': p[t],
+            'hw_expected': expected[t],
+            'chi2': chi2[t],
+            'p_value': p_values[t],
+            'offspring': offspring[t],
+        }
+    return summary
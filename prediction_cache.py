@@ -0,0 +1,107 @@
+# 세션 간 공유 예측 캐시
+#
+# 같은 (본인, 배우자) 유전자형 조합은 어느 세션에서 들어오든 결과가 같으므로
+# 프로세스 전체에서 하나의 캐시를 공유한다. Streamlit은 세션마다 별도 스레드에서
+# 스크립트를 실행하므로 모든 접근은 lock으로 보호한다.
+
+import threading
+import time
+from collections import OrderedDict
+
+from genetics_engine import freeze_genotype, parent_genotypes, predict_children
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600
+
+class PredictionCache:
+    """LRU + TTL 방식으로 오래된 항목을 내보내는 스레드 안전 캐시"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (저장 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """캐시된 값 반환, 없거나 만료되었으면 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """값 저장, 용량을 넘으면 가장 오래 사용되지 않은 항목부터 제거"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """적중/실패 횟수 등 캐시 상태"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+# 프로세스 전체에서 공유하는 캐시
+shared_cache = PredictionCache()
+
+def genotype_key(traits, user_data, spouse_data, default=None):
+    """형질 순서대로 (id, 본인 유전자형, 배우자 유전자형)을 나열한 정규화된 캐시 키"""
+    return tuple(
+        (t['id'],) + tuple(
+            freeze_genotype(g) for g in parent_genotypes(t['id'], user_data, spouse_data, default)
+        )
+        for t in traits
+    )
+
+def cached_predict(traits, user_data, spouse_data, default=None, cache=None,
+                   compute=predict_children):
+    """
+    predict_children 결과를 공유 캐시를 거쳐 반환
+
+    compute: 캐시에 없을 때 호출할 계산 함수 (predict_children과 같은 인자)
+    반환값은 여러 세션이 함께 참조하므로 수정하지 말 것
+    """
+    cache = cache or shared_cache
+    key = genotype_key(traits, user_data, spouse_data, default)
+    result = cache.get(key)
+    if result is None:
+        result = compute(traits, user_data, spouse_data, default)
+        cache.put(key, result)
+    return result
+
+def cached_predict_many(traits, couples, default=None, cache=None):
+    """배치 예측: [(user_data, spouse_data), ...] 순서대로 결과 목록 반환"""
+    return [
+        cached_predict(traits, user_data, spouse_data, default, cache)
+        for user_data, spouse_data in couples
+    ]
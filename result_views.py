@@ -0,0 +1,99 @@
+# 결과 화면 구성 요소
+#
+# 두 Streamlit 앱(genetics_app.py, genetics_photo_version.py)의 결과 페이지에서
+# 같은 모양으로 쓰는 탭 내용을 한 곳에 모아 둔다. 앱마다 다른 값(형질 레지스트리,
+# 부모 데이터, 입력이 없을 때의 기본 유전자형)은 인자로 받는다.
+# 각 화면은 fragment라서 안의 위젯을 바꿔도 결과 페이지 전체를 다시 실행하지 않는다.
+
+import streamlit as st
+
+from genetics_engine import format_genotype, parent_genotypes
+from siblings import sibling_summary
+
+# ==========================================
+# 만약에? (부모 유전자형 민감도)
+# ==========================================
+
+# 민감도 표의 자녀 결과 선택지와 부모 대안 열 이름 (유전자형 코드 순서)
+OUTCOME_CHOICES = ["DD · 높음/어두움", "Dd · 중간", "dd · 낮음/밝음"]
+ALTERNATIVE_COLUMNS = ["DD로 바꾸면", "Dd로 바꾸면", "dd로 바꾸면"]
+
+@st.fragment
+def sensitivity_view(traits, matrix, user_data, spouse_data, default=None):
+    """
+    부모 한쪽 유전자형을 바꿨을 때의 자녀 확률표
+
+    matrix: genetics_engine.sensitivity_matrix 결과 (같은 traits, default로 계산한 것)
+    default: 부모 데이터에 형질이 없을 때 표시할 유전자형 (None이면 KeyError)
+    결과 페이지에서 한 번 계산해 둔 배열에서 고르기만 하므로 선택을 바꿔도 다시 계산하지 않는다.
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        parent = st.radio("바꿔 볼 부모", ["본인", "배우자"], horizontal=True)
+    with col2:
+        outcome = st.radio(
+            "자녀 결과",
+            range(len(OUTCOME_CHOICES)),
+            format_func=lambda k: OUTCOME_CHOICES[k],
+            horizontal=True
+        )
+
+    role = 'user' if parent == "본인" else 'spouse'
+    side = 0 if role == 'user' else 1
+    alternatives = matrix[role][:, :, outcome]
+
+    table = {
+        '형질': [t['name'] for t in traits],
+        '현재 유전자형': [
+            format_genotype(parent_genotypes(t['id'], user_data, spouse_data, default)[side])
+            for t in traits
+        ],
+        '현재': matrix['current'][:, outcome],
+    }
+    for i, column in enumerate(ALTERNATIVE_COLUMNS):
+        table[column] = alternatives[:, i]
+
+    probability = st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1)
+    st.dataframe(
+        table,
+        column_config={column: probability for column in ['현재'] + ALTERNATIVE_COLUMNS},
+        hide_index=True
+    )
+    st.caption("※ 다인자 형질(키, 피부색)은 DD/Dd/dd가 각각 큰 키·어두움 / 중간 / 작은 키·밝음에 해당합니다.")
+
+# ==========================================
+# 여러 자녀
+# ==========================================
+
+@st.fragment
+def siblings_view(traits, child_probs):
+    """
+    자녀 여러 명에 대한 확률 - 자녀 수를 바꿔도 이 영역만 다시 계산
+
+    child_probs: (형질 수, 3) 자녀 한 명의 형질별 분포 (sensitivity_matrix의 'current')
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        k = st.number_input("자녀 수", min_value=1, max_value=100, value=2, step=1)
+    with col2:
+        j = st.slider("정확히 몇 명이 열성?", min_value=0, max_value=k, value=min(1, k))
+
+    summary = sibling_summary(child_probs, traits, k)
+    st.metric("형제자매 사이 서로 다른 표현형 조합 (기댓값)", f"{summary['expected_combinations']:.1f}가지")
+
+    probability = st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1)
+    st.dataframe(
+        {
+            '형질': [t['name'] for t in traits],
+            '적어도 1명 열성': summary['at_least_one'],
+            f'정확히 {j}명 열성': summary['exactly'][:, j],
+            '열성 자녀 수 (기댓값)': summary['expected_recessive'],
+        },
+        column_config={
+            '적어도 1명 열성': probability,
+            f'정확히 {j}명 열성': probability,
+            '열성 자녀 수 (기댓값)': st.column_config.NumberColumn(format="%.2f명"),
+        },
+        hide_index=True
+    )
+    st.caption("※ 열성 = dd (다인자 형질은 낮음/밝음). 자녀끼리, 형질끼리는 서로 독립이라고 가정합니다.")
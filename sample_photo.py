@@ -0,0 +1,16 @@
+# 합성 인물 사진
+#
+# 실제 사진 없이 사진 분석 경로를 돌려 볼 때 쓰는 이미지.
+# 작업자 예열(warm_start), 시작 비용 측정(startup_profile), 부하 테스트(load_test)가 함께 쓴다.
+
+import numpy as np
+from PIL import Image
+
+def synthetic_image(size=(640, 800), seed=0):
+    """잡음 섞인 인물 비슷한 그라데이션 RGB 이미지 (위는 어두운 머리카락, 아래는 밝은 피부 색)"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    y = np.linspace(0, 1, height)[:, None, None]
+    base = np.array([60, 45, 35]) * (1 - y) + np.array([220, 180, 160]) * y
+    pixels = np.broadcast_to(base, (height, width, 3)) + rng.normal(0, 12, (height, width, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
@@ -0,0 +1,197 @@
+# 세션별 메모리 관리
+#
+# 사진 분석이 끝나면 필요한 것은 유전자형 문자열 몇 개뿐이다.
+# 업로드 위젯에 남은 원본 파일과 디코딩된 PIL 이미지를 바로 놓아주고
+# 작은 썸네일만 남긴 뒤, 세션 상태 전체를 바이트 예산 안으로 유지한다.
+#
+# 업로드한 원본 bytes는 session_state와 별도로 Streamlit 런타임의 업로드 관리자
+# (MemoryUploadedFileManager)에도 세션이 끝날 때까지 남는다. 분석이 끝나면 그쪽에서도
+# 지우고(chat_input이 하는 방식과 같음), 사용량에는 관리자가 들고 있는 bytes를 센다.
+
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+from streamlit.runtime.memory_uploaded_file_manager import MemoryUploadedFileManager
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# 세션 하나가 분석 이후에도 들고 있을 수 있는 최대 바이트 (환경 변수로 조정)
+DEFAULT_BUDGET_BYTES = int(os.environ.get('GENETICS_SESSION_BUDGET_BYTES', 256 * 1024))
+# 이 시간 동안 다시 실행되지 않은 세션은 끝난 것으로 보고 집계에서 뺌
+DEFAULT_IDLE_SECONDS = int(os.environ.get('GENETICS_SESSION_IDLE_SECONDS', 3600))
+# 프로세스 전체 집계를 이벤트로 남기는 최소 간격
+DEFAULT_REPORT_INTERVAL_SECONDS = 60
+THUMBNAIL_SIZE = 160
+
+# ==========================================
+# 크기 측정
+# ==========================================
+
+def sizeof(obj, seen=None):
+    """객체가 붙잡고 있는 대략적인 메모리 사용량(bytes)"""
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, Image.Image):
+        return obj.width * obj.height * len(obj.getbands())
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            sizeof(k, seen) + sizeof(v, seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(sizeof(v, seen) for v in obj)
+    if hasattr(obj, 'getbuffer'):
+        return obj.getbuffer().nbytes
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + sizeof(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+def session_usage(state):
+    """세션 상태 항목별 사용량 {key: bytes}"""
+    return {key: sizeof(state[key]) for key in list(state.keys())}
+
+# ==========================================
+# 사진 해제
+# ==========================================
+
+def make_thumbnail(image, size=THUMBNAIL_SIZE):
+    """화면 표시용 작은 JPEG 썸네일 bytes"""
+    thumbnail = image.convert('RGB')
+    thumbnail.thumbnail((size, size))
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format='JPEG', quality=80)
+    return buffer.getvalue()
+
+def upload_key(state, role):
+    """업로드 위젯 key - 버전을 올리면 이전 위젯과 업로드 파일이 세션에서 빠진다"""
+    return f"{role}_photo_{state.upload_versions.get(role, 0)}"
+
+def _upload_manager():
+    """
+    현재 세션 id와 업로드 관리자
+
+    원본 파일을 직접 지울 수 있는 MemoryUploadedFileManager일 때만 반환하고,
+    다른 관리자이거나 Streamlit 실행 밖이면 (None, None)
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or not isinstance(ctx.uploaded_file_mgr, MemoryUploadedFileManager):
+        return None, None
+    return ctx.session_id, ctx.uploaded_file_mgr
+
+def release_upload(file_id):
+    """업로드 관리자에 남은 원본 파일 삭제 (지울 수 없는 관리자면 아무것도 하지 않음)"""
+    session_id, manager = _upload_manager()
+    if manager is not None:
+        manager.remove_file(session_id=session_id, file_id=file_id)
+
+def upload_bytes():
+    """업로드 관리자가 현재 세션 몫으로 들고 있는 원본 파일 bytes (알 수 없으면 None)"""
+    session_id, manager = _upload_manager()
+    if manager is None:
+        return None
+    files = list(manager.file_storage.get(session_id, {}).values())
+    return sum(len(f.data) for f in files)
+
+def release_photo(state, role, image=None, thumbnail=None):
+    """
+    분석이 끝난 사진을 썸네일만 남기고 해제
+
+    - 썸네일을 state.thumbnails[role]에 저장 (thumbnail: 미리 만든 JPEG bytes, 없으면 image로 생성)
+    - 업로드 관리자에서 원본 파일을 지움
+    - 업로드 위젯 key 버전을 올려 다음 실행부터 원본 파일이 참조되지 않게 함
+    - 디코딩된 이미지 버퍼를 닫음
+    """
+    state.thumbnails[role] = thumbnail if thumbnail is not None else make_thumbnail(image)
+    uploaded = state.get(upload_key(state, role))
+    if uploaded is not None:
+        release_upload(uploaded.file_id)
+    state.upload_versions[role] = state.upload_versions.get(role, 0) + 1
+    if image is not None:
+        image.close()
+
+def is_upload_key(key):
+    """업로드 위젯 key 여부 (upload_key 형식)"""
+    prefix, _, version = key.rpartition('_photo_')
+    return bool(prefix) and version.isdigit()
+
+def enforce_budget(state, budget=DEFAULT_BUDGET_BYTES):
+    """
+    세션 상태가 예산을 넘으면 썸네일부터 버림
+
+    분석 전 업로드 파일은 사용자가 작업 중이고 분석 직후 해제되므로 예산에서 제외한다.
+    업로드 크기는 업로드 관리자가 들고 있는 원본 bytes로 세고, 알 수 없으면 업로드 위젯 값으로 센다.
+    반환: (업로드 포함 전체 사용량, 버린 썸네일 역할 목록)
+    """
+    usage = session_usage(state)
+    widget_uploads = sum(nbytes for key, nbytes in usage.items() if is_upload_key(key))
+    retained = sum(usage.values()) - widget_uploads
+    uploads = upload_bytes()
+    if uploads is None:
+        uploads = widget_uploads
+    released = []
+    for role in list(state.thumbnails):
+        if retained <= budget:
+            break
+        retained -= sizeof(state.thumbnails.pop(role))
+        released.append(role)
+    return retained + uploads, released
+
+# ==========================================
+# 프로세스 전체 집계
+# ==========================================
+
+class MemoryLedger:
+    """세션 id별 마지막 측정 사용량 - 어떤 세션이 메모리를 붙잡고 있는지 확인용"""
+
+    def __init__(self, max_idle_seconds=DEFAULT_IDLE_SECONDS):
+        self.max_idle_seconds = max_idle_seconds
+        self._usage = {}  # session_id -> (측정 시각, bytes)
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, session_id, nbytes):
+        """세션 사용량 기록 - 기록할 때마다 오래 갱신되지 않은 세션을 함께 정리"""
+        with self._lock:
+            self._usage[session_id] = (time.time(), nbytes)
+        self.forget()
+
+    def forget(self, max_idle_seconds=None):
+        """오래 갱신되지 않은(끝난) 세션 기록 삭제, 반환: 삭제한 개수"""
+        if max_idle_seconds is None:
+            max_idle_seconds = self.max_idle_seconds
+        cutoff = time.time() - max_idle_seconds
+        with self._lock:
+            idle = [s for s, (t, _) in self._usage.items() if t < cutoff]
+            for session_id in idle:
+                del self._usage[session_id]
+        return len(idle)
+
+    def report(self):
+        """{'sessions', 'total_bytes', 'max_bytes', 'per_session': {id: bytes}}"""
+        with self._lock:
+            per_session = {s: nbytes for s, (_, nbytes) in self._usage.items()}
+        return {
+            'sessions': len(per_session),
+            'total_bytes': sum(per_session.values()),
+            'max_bytes': max(per_session.values(), default=0),
+            'per_session': per_session,
+        }
+
+    def report_due(self, interval=DEFAULT_REPORT_INTERVAL_SECONDS):
+        """마지막 집계 후 interval초가 지났으면 report(), 아니면 None (이벤트 기록 주기 조절용)"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_report < interval:
+                return None
+            self._last_report = now
+        return self.report()
+
+ledger = MemoryLedger()
@@ -0,0 +1,83 @@
+# 이어하기 화면 구성 요소
+#
+# 두 Streamlit 앱(genetics_app.py, genetics_photo_version.py)이 진행 상황을 같은 방식으로
+# 저장(session_store)하고 이어하기 코드로 복원하도록 한 곳에 모아 둔다.
+# 앱마다 다른 값(앱 이름, 형질 레지스트리, 저장할 내용, 복원 후 앱별 상태 정리)은 인자로 받는다.
+#   snapshot(): 저장할 (사람별 유전자형, 나머지 상태)
+#   restore(people, state): 본인/배우자 유전자형을 되돌린 뒤 나머지 사람과 상태 복원
+# 본인/배우자 유전자형은 세션의 '{role}_data'와 선택 위젯 값('{role}_{trait_id}')으로 되돌린다.
+
+import json
+
+import streamlit as st
+
+from event_log import log_session_event
+from genetics_engine import is_mixture
+from session_store import normalize_token, shared_store
+
+PARENT_ROLES = ('user', 'spouse')
+
+def save_progress(app, traits, snapshot):
+    """마지막 저장 이후 입력이 바뀌었을 때만 저장하고 이어하기 코드를 주소에 남김"""
+    people, state = snapshot()
+    if not any(people.values()):
+        return
+    saved = json.dumps([people, state], sort_keys=True, ensure_ascii=False)
+    if saved == st.session_state.get('saved_snapshot'):
+        return
+    token = shared_store().save(app, traits, people, state, st.session_state.get('resume_token'))
+    st.session_state.resume_token = token
+    st.session_state.saved_snapshot = saved
+    st.query_params['resume'] = token
+
+def resume_progress(app, traits, token, restore):
+    """
+    이어하기 코드로 저장된 세션 복원 (선택 위젯 값도 저장된 유전자형으로 맞춤)
+
+    restore: 본인/배우자를 뺀 people과 state를 받아 앱별 상태를 복원하는 함수
+    반환: 복원했으면 True, 코드가 없으면 False
+    """
+    saved = shared_store().load(token, app, traits)
+    if saved is None:
+        return False
+
+    people, state = saved['people'], saved['state']
+    for role in PARENT_ROLES:
+        data = people.pop(role, {})
+        st.session_state[f"{role}_data"] = data
+        for trait_id, genotype in data.items():
+            label = None if is_mixture(genotype) else traits.option_label(trait_id, genotype)
+            if label is not None:
+                st.session_state[f"{role}_{trait_id}"] = label
+    restore(people, state)
+
+    st.session_state.resume_token = token
+    st.session_state.saved_snapshot = None
+    st.query_params['resume'] = token
+    return True
+
+def resume_from_url(app, traits, restore):
+    """주소에 이어하기 코드가 있으면 세션당 한 번 복원 (새로고침, 연결 끊김 후 돌아온 경우)"""
+    if 'resume_checked' in st.session_state:
+        return
+    st.session_state.resume_checked = True
+    token = normalize_token(st.query_params.get('resume', ''))
+    if token and resume_progress(app, traits, token, restore):
+        log_session_event(app, 'session_resumed', source='url')
+
+def resume_sidebar(app, traits, restore):
+    """사이드바의 이어하기 코드 표시와 코드로 불러오기"""
+    if st.session_state.get('resume_token'):
+        st.caption(f"💾 이어하기 코드: `{st.session_state.resume_token}`")
+        st.caption("새로고침해도 같은 주소로 돌아오면 이어서 할 수 있어요.")
+    with st.expander("📂 이어하기"):
+        code = st.text_input("이어하기 코드", key="resume_code", max_chars=12)
+        if st.button("불러오기", key="resume_button"):
+            token = normalize_token(code)
+            if token is None:
+                st.error("코드 형식이 올바르지 않습니다.")
+            elif resume_progress(app, traits, token, restore):
+                log_session_event(app, 'session_resumed', source='code')
+                st.rerun()
+            else:
+                st.error("저장된 진행 상황을 찾을 수 없습니다.")
@@ -0,0 +1,198 @@
+# 세션 저장 / 이어하기
+#
+# 새로고침하거나 웹소켓 연결이 끊기면 st.session_state가 사라져 사진을 다시 올리고
+# 다시 분석해야 한다. 진행 상황을 짧은 이어하기 코드(resume token)로 SQLite에 저장해 두고,
+# 같은 코드로 돌아오면 사진 분석을 다시 하지 않고 세션을 복원한다.
+#
+# 저장하는 것은 작은 값뿐이다.
+#   - 사람별 유전자형: (사람 수, 형질 수, 3) float32 코드 확률 배열 한 덩어리
+#     (genetics_engine.genotype_vector와 같은 표현, 입력하지 않은 형질은 0)
+#   - 진행 단계, 분석 여부, 사진 품질 측정값 같은 JSON 상태
+# 원본 사진이나 썸네일은 저장하지 않는다.
+#
+# 환경 변수:
+#   GENETICS_SESSION_DB  세션 저장소 SQLite 경로
+
+import json
+import os
+import secrets
+import sqlite3
+import time
+
+import numpy as np
+
+from genetics_engine import N_GENOTYPES, genotype_vector, trait_ids
+from sqlite_store import connect, create_schema, shared_instance
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.environ.get('GENETICS_SESSION_DB', os.path.join(APP_DIR, 'data', 'sessions.sqlite3'))
+DEFAULT_RETENTION_SECONDS = 30 * 24 * 3600
+
+# 헷갈리기 쉬운 0/O, 1/I/L을 뺀 문자로 만든 8자리 코드 (약 40비트)
+TOKEN_ALPHABET = '23456789ABCDEFGHJKMNPQRSTUVWXYZ'
+TOKEN_LENGTH = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    app TEXT NOT NULL,
+    trait_ids TEXT NOT NULL,
+    people TEXT NOT NULL,
+    genotypes BLOB NOT NULL,
+    state TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+"""
+
+def new_token():
+    return ''.join(secrets.choice(TOKEN_ALPHABET) for _ in range(TOKEN_LENGTH))
+
+def normalize_token(token):
+    """사용자가 입력한 코드 정리 (공백/하이픈 제거, 대문자), 형식이 틀리면 None"""
+    token = ''.join(token.split()).replace('-', '').upper()
+    if len(token) != TOKEN_LENGTH or any(c not in TOKEN_ALPHABET for c in token):
+        return None
+    return token
+
+# ==========================================
+# 유전자형 <-> 코드 확률 배열
+# ==========================================
+
+def encode_people(traits, people):
+    """
+    {이름: {trait_id: 유전자형 또는 혼합}} -> (사람 수, 형질 수, 3) float32 배열
+
+    입력하지 않은 형질은 0 벡터로 남긴다.
+    """
+    ids = trait_ids(traits)
+    vectors = np.zeros((len(people), len(ids), N_GENOTYPES), dtype=np.float32)
+    for p, data in enumerate(people.values()):
+        for t, trait_id in enumerate(ids):
+            if trait_id in data:
+                vectors[p, t] = genotype_vector(data[trait_id])
+    return vectors
+
+def decode_genotype(trait, vector):
+    """코드 확률 벡터 -> 유전자형 (확률 1인 코드가 있으면) 또는 혼합 유전자형, 0 벡터면 None"""
+    if not vector.any():
+        return None
+    code = int(vector.argmax())
+    if vector[code] == 1.0:
+        return trait['genotypes'][code]
+    # float32로 저장했으므로 그 정밀도(유효숫자 약 7자리)까지만 살림
+    return {trait['genotypes'][k]: round(float(p), 6) for k, p in enumerate(vector) if p > 0}
+
+def decode_people(traits, names, ids, vectors):
+    """
+    encode_people의 역변환 - 저장할 때의 형질 id 순서(ids)로 읽어
+    현재 형질 목록에 있는 형질만 복원
+
+    반환: {이름: {trait_id: 유전자형 또는 혼합}}
+    """
+    by_id = {trait['id']: trait for trait in traits}
+    people = {}
+    for name, rows in zip(names, vectors):
+        data = {}
+        for trait_id, vector in zip(ids, rows):
+            if trait_id in by_id:
+                genotype = decode_genotype(by_id[trait_id], vector)
+                if genotype is not None:
+                    data[trait_id] = genotype
+        people[name] = data
+    return people
+
+# ==========================================
+# 저장소
+# ==========================================
+
+class SessionStore:
+    """이어하기 코드 -> 세션 요약을 저장하는 SQLite(WAL) 저장소"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, retention_seconds=DEFAULT_RETENTION_SECONDS):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        create_schema(db_path, _SCHEMA)
+        self.purge()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def save(self, app, traits, people, state, token=None):
+        """
+        세션 저장 (token이 있으면 덮어쓰기, 없으면 새 코드 발급)
+
+        people: {이름: {trait_id: 유전자형 또는 혼합}} (예: 'user', 'spouse', 'relative_0')
+        state: JSON으로 저장할 나머지 상태 (진행 단계, 분석 여부, 품질 측정값 등)
+        반환: 이어하기 코드
+        """
+        row = (
+            app,
+            ','.join(trait_ids(traits)),
+            json.dumps(list(people), ensure_ascii=False),
+            encode_people(traits, people).tobytes(),
+            json.dumps(state, ensure_ascii=False),
+        )
+        now = time.time()
+        with self._connect() as db:
+            if token is not None:
+                updated = db.execute(
+                    "UPDATE sessions SET app = ?, trait_ids = ?, people = ?, genotypes = ?, state = ?, "
+                    "updated = ? WHERE token = ?",
+                    row + (now, token)
+                ).rowcount
+                if updated:
+                    return token
+            # 새 코드 (만료되어 지워진 코드로 다시 저장하는 경우도 새로 발급)
+            while True:
+                token = new_token()
+                try:
+                    db.execute(
+                        "INSERT INTO sessions (token, app, trait_ids, people, genotypes, state, created, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (token,) + row + (now, now)
+                    )
+                    return token
+                except sqlite3.IntegrityError:
+                    continue
+
+    def load(self, token, app, traits):
+        """
+        저장된 세션 읽기
+
+        반환: {'people': {이름: {trait_id: 유전자형 또는 혼합}}, 'state': {...}, 'updated'}
+              (코드가 없거나 다른 앱의 세션이면 None)
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT trait_ids, people, genotypes, state, updated FROM sessions WHERE token = ? AND app = ?",
+                (token, app)
+            ).fetchone()
+        if row is None:
+            return None
+
+        ids, names, blob, state, updated = row
+        ids = ids.split(',')
+        names = json.loads(names)
+        vectors = np.frombuffer(blob, dtype=np.float32).reshape(len(names), len(ids), N_GENOTYPES)
+        return {
+            'people': decode_people(traits, names, ids, vectors),
+            'state': json.loads(state),
+            'updated': updated,
+        }
+
+    def delete(self, token):
+        with self._connect() as db:
+            db.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+    def purge(self, max_age_seconds=None):
+        """오랫동안 저장되지 않은 세션 삭제, 반환: 삭제한 개수"""
+        if max_age_seconds is None:
+            max_age_seconds = self.retention_seconds
+        with self._connect() as db:
+            return db.execute("DELETE FROM sessions WHERE updated < ?",
+                              (time.time() - max_age_seconds,)).rowcount
+
+# 프로세스 전체에서 공유하는 세션 저장소 (처음 사용할 때 생성)
+shared_store = shared_instance(SessionStore)
@@ -0,0 +1,152 @@
+# 여러 자녀(형제자매) 확률 계산
+#
+# 자녀 한 명의 형질별 분포(genetics_engine.sensitivity_matrix의 'current',
+# predict_mixture_batch 결과 등)에서 k명의 자녀에 대한 질문에 닫힌 식으로 답한다.
+#   - 형질별로 정확히 j명 / 적어도 1명이 열성(자녀 코드 2)을 보일 확률: 이항분포
+#   - 형제자매 사이에 나타나는 서로 다른 표현형 조합 수의 기댓값
+# 자녀끼리는 독립이고 형질끼리도 독립이라고 가정한다.
+# 모든 함수는 앞쪽 배치 차원(부부 수 등)을 그대로 지원하고,
+# monte_carlo_siblings는 닫힌 식 결과를 확인하는 용도로만 쓴다.
+
+import numpy as np
+
+from genetics_engine import is_polygenic
+
+# 조합 확률 배열 한 번에 만들 원소 수 상한 (부부 배치를 이 크기로 나눠 계산)
+# 부부 한 쌍의 조합 수(단일 유전자 형질 수 m, 다인자 형질 수 p일 때 2^m x 3^p)가
+# 이보다 크면 나눠서도 계산할 수 없으므로 ValueError
+MAX_COMBINATION_CELLS = 1 << 22
+
+def _log_factorials(k):
+    """log(0!) ~ log(k!) - 큰 k에서도 넘치지 않도록 로그 누적합으로 계산"""
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, k + 1)))])
+
+def _xlogy(x, y):
+    """x * log(y), 단 x == 0이면 0 (확률 0/1인 경우 처리)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(x == 0, 0.0, x * np.log(y))
+
+def recessive_probs(child_probs):
+    """자녀 한 명이 형질별로 열성(자녀 코드 2: dd, 다인자는 낮음/밝음)을 보일 확률 (..., 형질 수)"""
+    return np.asarray(child_probs)[..., 2]
+
+def recessive_count_distribution(child_probs, k):
+    """
+    자녀 k명 중 정확히 j명이 열성을 보일 확률 (이항분포)
+
+    반환: (..., 형질 수, k + 1) 배열 - [..., t, j]
+    """
+    p = recessive_probs(child_probs)[..., None]
+    j = np.arange(k + 1)
+    log_fact = _log_factorials(k)
+    log_comb = log_fact[k] - log_fact[j] - log_fact[k - j]
+    return np.exp(log_comb + _xlogy(j, p) + _xlogy(k - j, 1 - p))
+
+def at_least_one_recessive(child_probs, k):
+    """자녀 k명 중 적어도 1명이 열성을 보일 확률 (..., 형질 수)"""
+    p = recessive_probs(child_probs)
+    # 1 - (1 - p)^k 를 p가 작을 때도 정확하게
+    with np.errstate(divide='ignore'):
+        return -np.expm1(k * np.log1p(-p))
+
+def phenotype_class_probs(child_probs, traits):
+    """
+    형질별 자녀 표현형 분포 목록
+
+    단일 유전자 형질은 (우성 표현, 열성 표현) 2가지, 다인자 형질은 결과 3가지
+    반환: [(..., 2 또는 3) 배열, ...] 형질 순서
+    """
+    child_probs = np.asarray(child_probs)
+    classes = []
+    for t, trait in enumerate(traits):
+        probs = child_probs[..., t, :]
+        if not is_polygenic(trait):
+            probs = np.stack([probs[..., 0] + probs[..., 1], probs[..., 2]], axis=-1)
+        classes.append(probs)
+    return classes
+
+def combination_probs(child_probs, traits):
+    """
+    자녀 한 명의 전체 표현형 조합 분포 (형질별 분포의 곱)
+
+    반환: (..., 조합 수) 배열 - 조합 순서는 형질 순서의 혼합 진법
+    """
+    classes = phenotype_class_probs(child_probs, traits)
+    combos = np.ones(classes[0].shape[:-1] + (1,))
+    for probs in classes:
+        combos = (combos[..., :, None] * probs[..., None, :]).reshape(combos.shape[:-1] + (-1,))
+    return combos
+
+def expected_distinct_combinations(child_probs, traits, k):
+    """
+    자녀 k명 사이에 나타나는 서로 다른 표현형 조합 수의 기댓값
+
+    E = sum_c (1 - (1 - q_c)^k), q_c = 자녀 한 명이 조합 c일 확률
+    반환: (...) 배열 - 부부 배치가 크면 나눠서 계산
+    조합 수가 MAX_COMBINATION_CELLS보다 많으면 (형질이 너무 많으면) ValueError
+    """
+    child_probs = np.asarray(child_probs)
+    batch_shape = child_probs.shape[:-2]
+    flat = child_probs.reshape((-1,) + child_probs.shape[-2:])
+
+    n_combos = 1
+    for trait in traits:
+        n_combos *= 3 if is_polygenic(trait) else 2
+    if n_combos > MAX_COMBINATION_CELLS:
+        raise ValueError(f"표현형 조합이 너무 많습니다: {n_combos}가지 (최대 {MAX_COMBINATION_CELLS}가지)")
+    chunk = max(1, MAX_COMBINATION_CELLS // n_combos)
+    expected = np.empty(len(flat))
+    for start in range(0, len(flat), chunk):
+        q = combination_probs(flat[start:start + chunk], traits)
+        with np.errstate(divide='ignore'):
+            expected[start:start + chunk] = -np.expm1(k * np.log1p(-q)).sum(axis=-1)
+    return expected.reshape(batch_shape)
+
+def sibling_summary(child_probs, traits, k):
+    """
+    부부 한 쌍의 k명 자녀 요약
+
+    반환: {'at_least_one': (형질 수,), 'exactly': (형질 수, k + 1),
+           'expected_recessive': (형질 수,), 'expected_combinations': float}
+    """
+    return {
+        'at_least_one': at_least_one_recessive(child_probs, k),
+        'exactly': recessive_count_distribution(child_probs, k),
+        'expected_recessive': k * recessive_probs(child_probs),
+        'expected_combinations': float(expected_distinct_combinations(child_probs, traits, k)),
+    }
+
+# ==========================================
+# 몬테카를로 확인
+# ==========================================
+
+def monte_carlo_siblings(child_probs, traits, k, families=100_000, seed=None):
+    """
+    자녀 k명인 가족을 families번 표본추출해 닫힌 식 결과와 비교할 값 계산
+
+    child_probs: (형질 수, 3) 부부 한 쌍의 자녀 분포
+    반환: {'at_least_one', 'exactly', 'expected_combinations'} (sibling_summary와 같은 의미)
+    """
+    rng = np.random.default_rng(seed)
+    cumulative = np.cumsum(np.asarray(child_probs), axis=-1)
+    draws = rng.random((families, k, len(traits), 1))
+    codes = (draws > cumulative).sum(axis=-1)  # (가족, 자녀, 형질) 자녀 코드
+
+    recessive = (codes == 2).sum(axis=1)  # (가족, 형질)
+    exactly = np.stack([np.bincount(recessive[:, t], minlength=k + 1) for t in range(len(traits))])
+
+    # 표현형 조합을 정수 하나로 묶어 가족별 서로 다른 값 개수 세기
+    combo = np.zeros((families, k), dtype=np.int64)
+    for t, trait in enumerate(traits):
+        if is_polygenic(trait):
+            combo = combo * 3 + codes[:, :, t]
+        else:
+            combo = combo * 2 + (codes[:, :, t] == 2)
+    combo.sort(axis=1)
+    distinct = 1 + (np.diff(combo, axis=1) != 0).sum(axis=1)
+
+    return {
+        'at_least_one': (recessive > 0).mean(axis=0),
+        'exactly': exactly / families,
+        'expected_combinations': float(distinct.mean()),
+    }
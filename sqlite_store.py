@@ -0,0 +1,51 @@
+# SQLite 저장소 공통 도구
+#
+# 작업 큐(job_queue)와 세션 저장소(session_store)가 같은 방식으로 SQLite를 쓰도록
+# 연결 규칙과 프로세스 공유 객체 생성을 한 곳에 둔다.
+#   - 트랜잭션 하나마다 짧게 연결을 열고 닫는다 (스레드 사이에 연결을 공유하지 않음)
+#   - WAL 모드라서 여러 스레드/프로세스가 읽는 동안에도 쓸 수 있다
+#   - 잠겨 있으면 최대 BUSY_TIMEOUT_SECONDS초 기다린다
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_SECONDS = 10
+
+@contextmanager
+def connect(db_path):
+    """트랜잭션 하나 동안 쓸 연결 (끝나면 commit 후 닫음)"""
+    db = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS)
+    try:
+        db.execute("PRAGMA journal_mode=WAL")
+        with db:
+            yield db
+    finally:
+        db.close()
+
+def create_schema(db_path, schema):
+    """DB 파일이 들어갈 폴더를 만들고 스키마(CREATE ... IF NOT EXISTS 문) 적용"""
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    with connect(db_path) as db:
+        db.executescript(schema)
+
+def shared_instance(factory):
+    """
+    처음 호출할 때 factory()로 만든 객체를 프로세스 전체에서 공유하는 함수
+
+    예: shared_store = shared_instance(SessionStore)
+    """
+    instance = None
+    lock = threading.Lock()
+
+    def shared():
+        nonlocal instance
+        with lock:
+            if instance is None:
+                instance = factory()
+            return instance
+
+    shared.__doc__ = f"프로세스 전체에서 공유하는 {factory.__name__} (처음 사용할 때 생성)"
+    return shared
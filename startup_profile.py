@@ -0,0 +1,193 @@
+# 작업자 시작 비용 측정
+#
+# 새 프로세스에서 앱이 처음 뜰 때 드는 비용을 나눠서 보여준다.
+#   1. import 비용: python -X importtime 결과를 최상위 패키지별로 합산 (자기 시간 기준)
+#   2. 초기화 비용: warm_start의 예열 단계별 처음 실행 / 두 번째 실행 시간
+#   3. 첫 세션 지연: 새 프로세스에서 AppTest로 앱을 여러 번 실행해 첫 실행과 이후 실행 비교,
+#      예열(warm_up)을 먼저 한 경우와 하지 않은 경우를 함께 측정
+# 각 측정은 앞선 측정의 캐시가 섞이지 않도록 별도 하위 프로세스에서 실행한다.
+#
+# 실행 예:
+#   python startup_profile.py --app genetics_photo_version.py
+#   python startup_profile.py --app genetics_app.py --top 20 --runs 5
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from warm_start import APP_MODULES, APP_SCRIPTS
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_child(code, *args):
+    """새 파이썬 프로세스에서 code 실행, 마지막 출력 줄을 JSON으로 읽어 반환"""
+    env = dict(os.environ, GENETICS_EVENT_LOG='')  # 측정 중 이벤트는 기록하지 않음
+    result = subprocess.run(
+        [sys.executable, '-c', code, *args],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# ==========================================
+# 1. import 비용
+# ==========================================
+
+def import_times(modules):
+    """
+    -X importtime으로 모듈 목록을 import하며 모듈별 시간 측정
+
+    반환: [(모듈 이름, 자기 시간 us, 누적 시간 us, 깊이), ...] import 순서
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(modules)],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def import_summary(rows, modules, top=15):
+    """
+    최상위 패키지별 자기 시간 합계와, 앱이 직접 import하는 모듈(modules)의 누적 시간
+
+    반환: {'total_ms', 'packages': [(패키지, ms, 모듈 수), ...] 큰 순서, 'modules': {모듈: 누적 ms}}
+    """
+    packages = defaultdict(lambda: [0, 0])
+    for name, self_us, _, _ in rows:
+        package = packages[name.split('.')[0]]
+        package[0] += self_us
+        package[1] += 1
+    ranked = sorted(packages.items(), key=lambda item: -item[1][0])[:top]
+    return {
+        'total_ms': sum(row[1] for row in rows) / 1000,
+        'packages': [(name, us / 1000, count) for name, (us, count) in ranked],
+        # importtime은 모듈이 끝날 때 기록하므로 깊이 0인 줄이 직접 import한 모듈의 누적 시간
+        # (인터프리터 시작 때 import되는 site, encodings 등은 제외)
+        'modules': {name: cumulative_us / 1000 for name, _, cumulative_us, depth in rows
+                    if depth == 0 and name in modules},
+    }
+
+# ==========================================
+# 2. 예열 단계별 초기화 비용
+# ==========================================
+
+_STEPS_CODE = """
+import json, sys, time
+import warm_start
+app = sys.argv[1]
+timings = {}
+for name, step in warm_start.WARM_STEPS[app]:
+    runs = []
+    for _ in range(2):
+        start = time.perf_counter()
+        step(app)
+        runs.append(round((time.perf_counter() - start) * 1000, 1))
+    timings[name] = runs
+print(json.dumps(timings))
+"""
+
+def init_times(app):
+    """예열 단계별 [처음 실행 ms, 두 번째 실행 ms]"""
+    return run_child(_STEPS_CODE, app)
+
+# ==========================================
+# 3. 첫 세션 지연
+# ==========================================
+
+_SESSION_CODE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+import warm_start
+script, app, runs, warm = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4] == '1'
+# AppTest/런타임 자체의 1회성 초기화(컴포넌트 검색 등)는 실제 서버에서는 포트를 열기 전에
+# 끝나므로 빈 스크립트를 한 번 실행해 측정에서 뺀다
+AppTest.from_string('').run()
+result = {'streamlit_import_ms': round((time.perf_counter() - start) * 1000, 1)}
+if warm:
+    start = time.perf_counter()
+    warm_start.warm_up(app)
+    result['warm_up_ms'] = round((time.perf_counter() - start) * 1000, 1)
+result['runs_ms'] = []
+for _ in range(runs):
+    start = time.perf_counter()
+    at = AppTest.from_file(script, default_timeout=120).run()
+    result['runs_ms'].append(round((time.perf_counter() - start) * 1000, 1))
+    if at.exception:
+        result['error'] = str(at.exception[0].message)
+if app == 'photo':
+    # 사진 분석 작업이 처음 하는 일 (품질 검사 + 형질 분석)
+    from photo_analysis import analyze_traits
+    from photo_quality import check_quality
+    from sample_photo import synthetic_image
+    image = synthetic_image()
+    start = time.perf_counter()
+    check_quality(image)
+    analyze_traits(image, probabilistic=True)
+    result['first_analysis_ms'] = round((time.perf_counter() - start) * 1000, 1)
+print(json.dumps(result))
+"""
+
+def session_times(script, app, runs=3, warm=False):
+    """
+    새 프로세스에서 앱을 runs번 실행한 시간
+
+    warm: True면 실행 전에 warm_up (python warm_start.py로 띄운 작업자와 같은 상태)
+    반환: {'streamlit_import_ms', 'warm_up_ms', 'runs_ms': [...], 'first_analysis_ms'}
+    """
+    # 앱 안의 백그라운드 예열이 측정에 섞이지 않도록 warm 여부와 관계없이 끔
+    code = "import os; os.environ['GENETICS_WARM_START'] = '0'\n" + _SESSION_CODE
+    return run_child(code, script, app, str(runs), '1' if warm else '0')
+
+# ==========================================
+# 보고서
+# ==========================================
+
+def print_report(imports, steps, cold, warm):
+    print(f"[import] 합계 {imports['total_ms']:.0f}ms (자기 시간 기준, 패키지별)")
+    for name, ms, count in imports['packages']:
+        print(f"  {name:>20}: {ms:7.1f}ms ({count}개 모듈)")
+    print("[import] 앱이 직접 import하는 모듈 (누적)")
+    for name, ms in imports['modules'].items():
+        print(f"  {name:>20}: {ms:7.1f}ms")
+
+    print("[초기화] 예열 단계별 처음 / 두 번째 실행")
+    for name, (first, second) in steps.items():
+        print(f"  {name:>20}: {first:7.1f}ms / {second:7.1f}ms")
+
+    print("[첫 세션] 앱 실행 시간(ms), 첫 실행 -> 이후 실행")
+    for label, result in (('예열 없음', cold), ('예열 후', warm)):
+        line = f"  {label}: " + " -> ".join(f"{ms:.0f}" for ms in result['runs_ms'])
+        if 'warm_up_ms' in result:
+            line += f" (예열 {result['warm_up_ms']:.0f}ms, 요청 전에 처리)"
+        if 'first_analysis_ms' in result:
+            line += f", 첫 사진 분석 {result['first_analysis_ms']:.0f}ms"
+        print(line)
+        if 'error' in result:
+            print(f"    오류: {result['error']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="유전 형질 예측 앱 작업자 시작 비용 측정")
+    parser.add_argument('--app', default='genetics_photo_version.py', choices=sorted(APP_SCRIPTS))
+    parser.add_argument('--top', type=int, default=15, help="import 비용 상위 패키지 수")
+    parser.add_argument('--runs', type=int, default=3, help="새 프로세스에서 앱을 실행할 횟수")
+    args = parser.parse_args()
+
+    app = APP_SCRIPTS[args.app]
+    imports = import_summary(import_times(APP_MODULES[app]), APP_MODULES[app], args.top)
+    steps = init_times(app)
+    cold = session_times(args.app, app, args.runs, warm=False)
+    warm = session_times(args.app, app, args.runs, warm=True)
+    print_report(imports, steps, cold, warm)
+    return 1 if 'error' in cold or 'error' in warm else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# 형질 정의 레지스트리
+#
+# 형질 정의는 traits.json 한 곳에만 두고, 프로세스마다 한 번 읽어서
+# 읽기 전용 레지스트리로 컴파일한다. 두 Streamlit 앱, 예측 엔진, 배치 도구가
+# 같은 객체를 공유하므로 rerun마다 목록을 다시 거르거나 id로 선형 탐색하지 않는다.
+#
+# 레지스트리는 형질 정의(읽기 전용 딕셔너리)의 시퀀스이므로 기존처럼
+# for trait in traits / trait['id'] / trait['options'] 로 그대로 쓸 수 있고,
+# 추가로 다음 색인을 미리 만들어 둔다.
+#   - id -> 형질, id -> 순서 번호
+#   - 형질별 선택지 이름 <-> 유전자형, 유전자형 -> 정수 코드
+#   - 사진 자동 인식 / 수동 입력 형질 분할
+#   - 자녀 분포 테이블 (genetics_engine.offspring_tables와 같은 값)
+#
+# traits.json 형식:
+#   {"traits": [{"id", "name", "auto_detect", "dominant", "recessive",
+#                "options": {선택지 이름: 유전자형}}, ...],
+#    "trait_sets": {이름: {"ids": [형질 id, ...], "names": {형질 id: 표시 이름}}}}
+#
+# 환경 변수:
+#   GENETICS_TRAITS  형질 정의 파일 경로
+
+import json
+import os
+from collections.abc import Sequence
+from functools import lru_cache
+from types import MappingProxyType
+
+from genetics_engine import GENOTYPE_CODES, genotype_labels, is_polygenic, offspring_tables
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TRAITS_PATH = os.environ.get('GENETICS_TRAITS', os.path.join(APP_DIR, 'traits.json'))
+
+REQUIRED_FIELDS = ('id', 'name', 'dominant', 'recessive', 'options')
+
+def compile_trait(definition, index):
+    """
+    형질 정의 하나를 읽기 전용 딕셔너리로 컴파일
+
+    원래 필드에 다음을 더한다:
+      'index': 레지스트리 안 순서, 'polygenic': 다인자 유전 여부,
+      'option_labels': 선택지 이름 튜플, 'genotypes': 코드 순서 유전자형 이름 튜플,
+      'codes': {유전자형: 정수 코드}, 'option_for': {유전자형: 첫 번째 선택지 이름}
+    """
+    missing = [field for field in REQUIRED_FIELDS if field not in definition]
+    if missing:
+        raise ValueError(f"형질 정의에 필드가 없습니다: {definition.get('id', '?')} {missing}")
+    unknown = [g for g in definition['options'].values() if g not in GENOTYPE_CODES]
+    if unknown:
+        raise ValueError(f"알 수 없는 유전자형: {definition['id']} {unknown}")
+
+    trait = dict(definition)
+    trait['options'] = MappingProxyType(dict(definition['options']))
+    trait['auto_detect'] = bool(definition.get('auto_detect', False))
+    trait['index'] = index
+    trait['polygenic'] = is_polygenic(trait)
+    trait['option_labels'] = tuple(trait['options'])
+    trait['genotypes'] = tuple(genotype_labels(trait))
+    trait['codes'] = MappingProxyType({g: GENOTYPE_CODES[g] for g in trait['options'].values()})
+    option_for = {}
+    for label, genotype in trait['options'].items():
+        option_for.setdefault(genotype, label)
+    trait['option_for'] = MappingProxyType(option_for)
+    return MappingProxyType(trait)
+
+class TraitRegistry(Sequence):
+    """컴파일된 형질 정의 목록과 색인 (만든 뒤에는 바뀌지 않음)"""
+
+    def __init__(self, definitions):
+        if not definitions:
+            raise ValueError("형질 정의가 없습니다")
+        self.traits = tuple(compile_trait(d, i) for i, d in enumerate(definitions))
+        self.ids = tuple(t['id'] for t in self.traits)
+        if len(set(self.ids)) != len(self.ids):
+            raise ValueError(f"형질 id가 중복되었습니다: {self.ids}")
+
+        self.by_id = MappingProxyType({t['id']: t for t in self.traits})
+        self.positions = MappingProxyType({trait_id: i for i, trait_id in enumerate(self.ids)})
+        self.auto = tuple(t for t in self.traits if t['auto_detect'])
+        self.manual = tuple(t for t in self.traits if not t['auto_detect'])
+
+        self.tables = offspring_tables(self.traits)
+        self.tables.flags.writeable = False
+
+    def __getitem__(self, i):
+        return self.traits[i]
+
+    def __len__(self):
+        return len(self.traits)
+
+    def get(self, trait_id):
+        """id로 형질 조회 (없으면 KeyError)"""
+        return self.by_id[trait_id]
+
+    def position(self, trait_id):
+        """형질의 순서 번호 (코드 배열의 열 번호)"""
+        return self.positions[trait_id]
+
+    def genotype(self, trait_id, option_label):
+        """선택지 이름 -> 유전자형"""
+        return self.by_id[trait_id]['options'][option_label]
+
+    def option_label(self, trait_id, genotype):
+        """유전자형 -> 선택지 이름 (같은 유전자형의 선택지가 여럿이면 첫 번째, 없으면 None)"""
+        return self.by_id[trait_id]['option_for'].get(genotype)
+
+    def code(self, trait_id, genotype):
+        """유전자형 -> 정수 코드 (genetics_engine.GENOTYPE_CODES와 같은 값)"""
+        return self.by_id[trait_id]['codes'][genotype]
+
+    def subset(self, ids, names=None):
+        """
+        일부 형질만 골라 새 레지스트리 생성
+
+        names: {형질 id: 표시 이름} 이 레지스트리에서만 이름을 바꿀 형질
+        """
+        names = names or {}
+        definitions = []
+        for trait_id in ids:
+            definition = {k: v for k, v in self.by_id[trait_id].items()
+                          if k in REQUIRED_FIELDS or k == 'auto_detect'}
+            if trait_id in names:
+                definition['name'] = names[trait_id]
+            definitions.append(definition)
+        return TraitRegistry(definitions)
+
+@lru_cache(maxsize=None)
+def _load_all(path):
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    return TraitRegistry(spec['traits']), MappingProxyType(spec.get('trait_sets', {}))
+
+@lru_cache(maxsize=None)
+def load_registry(trait_set=None, path=DEFAULT_TRAITS_PATH):
+    """
+    형질 정의 파일을 읽어 레지스트리로 컴파일 (경로, 이름별로 프로세스당 한 번)
+
+    trait_set: traits.json의 trait_sets 이름 (None이면 파일의 전체 형질)
+    """
+    registry, trait_sets = _load_all(path)
+    if trait_set is None:
+        return registry
+    if trait_set not in trait_sets:
+        raise KeyError(f"정의되지 않은 형질 묶음: {trait_set}")
+    spec = trait_sets[trait_set]
+    return registry.subset(spec['ids'], spec.get('names'))
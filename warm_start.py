@@ -0,0 +1,173 @@
+# 작업자 프로세스 예열 (warm start)
+#
+# 새로 뜬 작업자 프로세스의 첫 세션은 OpenCV, NumPy, PIL 같은 무거운 모듈 import,
+# 형질 레지스트리 컴파일, 색 LUT와 얼굴 검출 모델 로드, 분석 함수의 첫 호출 초기화 비용을
+# 혼자 떠안는다. 이 비용을 프로세스당 한 번, 사용자 요청과 상관없이 미리 치른다.
+#
+# - 배포: python warm_start.py genetics_photo_version.py [streamlit run 옵션...]
+#   예열을 끝낸 뒤 같은 프로세스에서 Streamlit 서버를 시작하므로, 포트가 열려 요청을 받을 때는
+#   import와 모델 로드가 이미 끝나 있다 (오토스케일링 작업자의 첫 요청 지연 제거).
+# - 앱: streamlit run으로 바로 띄운 경우에도 첫 세션에서 start_warm_up()을 st.cache_resource로
+#   한 번 호출해 백그라운드 스레드에서 모델과 분석기를 준비한다. 첫 화면은 기다리지 않고,
+#   사진을 올릴 때쯤에는 첫 분석도 이후 분석과 같은 속도가 된다.
+# 각 단계 소요 시간은 'warm_start' 이벤트로 남는다 (startup_profile.py로도 확인 가능).
+#
+# 환경 변수:
+#   GENETICS_WARM_START  0이면 앱에서 예열하지 않음
+
+import importlib
+import os
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+WARM_START = os.environ.get('GENETICS_WARM_START', '1') != '0'
+
+# 앱 스크립트 파일 -> 앱 이름 (event_log의 app 값, trait_registry의 형질 묶음 이름과 같음)
+APP_SCRIPTS = {
+    'genetics_app.py': 'basic',
+    'genetics_photo_version.py': 'photo',
+}
+
+# 앱이 첫 실행에서 import하는 모듈 (무거운 외부 모듈 먼저)
+# streamlit.emojis는 set_page_config(page_icon=이모지)가 처음 불릴 때 import된다 (약 50ms)
+APP_MODULES = {
+    'basic': (
+        'numpy', 'streamlit', 'streamlit.emojis', 'genetics_engine', 'trait_registry', 'incremental',
+        'prediction_cache', 'result_views', 'siblings', 'session_resume', 'session_store', 'event_log',
+    ),
+    'photo': (
+        'numpy', 'cv2', 'PIL.Image', 'streamlit', 'streamlit.emojis', 'genetics_engine', 'trait_registry',
+        'incremental', 'prediction_cache', 'result_views', 'siblings', 'session_resume', 'session_store',
+        'event_log', 'job_queue', 'photo_analysis', 'photo_jobs', 'photo_quality', 'session_memory',
+    ),
+}
+
+# ==========================================
+# 예열 단계
+# ==========================================
+
+def warm_imports(app):
+    for name in APP_MODULES[app]:
+        importlib.import_module(name)
+
+def warm_registry(app):
+    from trait_registry import load_registry
+    load_registry(app)
+
+def warm_engine(app):
+    """레지스트리 테이블로 일괄 예측, 민감도 계산을 한 번씩 실행"""
+    from genetics_engine import predict_children, predict_mixture_batch, sensitivity_matrix
+    from trait_registry import load_registry
+
+    traits = load_registry(app)
+    sample = {trait['id']: trait['genotypes'][1] for trait in traits}
+    predict_children(traits, sample, sample)
+    predict_mixture_batch(traits, [sample], [sample])
+    sensitivity_matrix(traits, sample, sample)
+
+def warm_detector(app):
+    from color_lut import load_lut
+    from photo_analysis import load_face_cascade
+    load_face_cascade()
+    load_lut()
+
+def warm_analyzers(app):
+    """품질 검사, 형질 분석, 단체 사진 분석을 작은 이미지로 한 번씩 실행 (첫 호출 초기화)"""
+    from photo_analysis import analyze_faces, analyze_traits
+    from photo_quality import check_quality
+    from sample_photo import synthetic_image
+
+    image = synthetic_image()
+    check_quality(image)
+    analyze_traits(image, probabilistic=True)
+    analyze_faces(image, faces=[(200, 250, 240, 240)])
+
+def warm_stores(app):
+    from session_store import shared_store
+    shared_store()
+    if app == 'photo':
+        from job_queue import shared_queue
+        shared_queue()
+
+# 앱별 예열 단계 (순서대로 실행)
+WARM_STEPS = {
+    'basic': (
+        ('imports', warm_imports),
+        ('registry', warm_registry),
+        ('engine', warm_engine),
+        ('stores', warm_stores),
+    ),
+    'photo': (
+        ('imports', warm_imports),
+        ('registry', warm_registry),
+        ('engine', warm_engine),
+        ('detector', warm_detector),
+        ('analyzers', warm_analyzers),
+        ('stores', warm_stores),
+    ),
+}
+
+_warmed = {}  # 앱 이름 -> 예열 단계별 소요 시간(ms)
+_lock = threading.Lock()
+
+def warm_up(app):
+    """
+    앱 하나에 필요한 모듈, 테이블, 모델을 미리 준비 (프로세스당 한 번, 이미 했으면 바로 반환)
+
+    반환: {단계 이름: 소요 시간(ms)}
+    """
+    with _lock:
+        if app in _warmed:
+            return _warmed[app]
+        timings = {}
+        for name, step in WARM_STEPS[app]:
+            start = time.perf_counter()
+            step(app)
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+        _warmed[app] = timings
+
+    from event_log import events
+    events.emit('warm_start', app=app, total_ms=round(sum(timings.values()), 1), **timings)
+    return timings
+
+def start_warm_up(app):
+    """
+    백그라운드 스레드에서 warm_up 실행 (이미 예열했으면 None)
+
+    앱에서는 st.cache_resource로 감싸 프로세스당 한 번만 호출한다.
+    """
+    if app in _warmed:
+        return None
+    thread = threading.Thread(target=warm_up, args=(app,), name=f'warm-start-{app}', daemon=True)
+    thread.start()
+    return thread
+
+# ==========================================
+# 예열 후 Streamlit 서버 시작
+# ==========================================
+
+def main(argv):
+    if not argv:
+        print("사용법: python warm_start.py <앱 스크립트> [streamlit run 옵션...]")
+        return 2
+    script = argv[0]
+    app = APP_SCRIPTS.get(os.path.basename(script))
+    if app is None:
+        print(f"알 수 없는 앱 스크립트: {script} ({', '.join(APP_SCRIPTS)} 중 하나)")
+        return 2
+
+    timings = warm_up(app)
+    print(f"예열 완료 ({app}): " + ", ".join(f"{name}={ms:.0f}ms" for name, ms in timings.items()))
+
+    # 같은 프로세스에서 streamlit run 실행 - 예열한 모듈과 모델을 그대로 공유
+    from streamlit.web import cli
+    sys.argv = ['streamlit', 'run', script] + list(argv[1:])
+    return cli.main()
+
+if __name__ == '__main__':
+    # 앱이 import하는 warm_start 모듈과 예열 기록(_warmed)을 공유하도록 모듈로 다시 import
+    sys.path.insert(0, APP_DIR)
+    import warm_start
+    sys.exit(warm_start.main(sys.argv[1:]))
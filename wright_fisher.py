@@ -0,0 +1,72 @@
+# 라이트-피셔(Wright-Fisher) 다세대 집단 시뮬레이터
+#
+# 개인 단위 객체 없이 형질별 유전자형 빈도만 들고 세대를 진행한다.
+# 한 세대 = 선택 -> (동류/무작위) 교배 -> 자녀 분포 -> 다항분포 표본추출(유전적 부동).
+# 자녀 분포는 punnett_square와 같은 규칙으로 만든 genetics_engine 테이블을 쓰므로
+# 앱의 예측 결과와 일관된다. 모든 연산은 (반복, 형질, 유전자형) 배열에 대해 한 번에 수행된다.
+
+import numpy as np
+
+from genetics_engine import is_polygenic, offspring_tables
+
+def fitness_matrix(traits, selection=None):
+    """
+    형질별 유전자형 적합도
+
+    selection: {trait_id: s} - 우성(높은 쪽) 형질 표현형의 선택계수.
+               단일 유전자는 완전 우성(DD, Dd 모두 1+s),
+               다인자 유전은 상가적(1+s, 1+s/2, 1)으로 적용한다.
+    반환: (형질 수, 3) 배열
+    """
+    selection = selection or {}
+    fitness = np.ones((len(traits), 3))
+    for t, trait in enumerate(traits):
+        s = selection.get(trait['id'], 0.0)
+        h = 0.5 if is_polygenic(trait) else 1.0
+        fitness[t] = [1 + s, 1 + h * s, 1]
+    return fitness
+
+def next_generation_probs(freqs, tables, fitness, assortative=0.0):
+    """
+    현재 유전자형 빈도에서 다음 세대 자녀 유전자형 확률 계산
+
+    freqs: (..., 형질 수, 3), tables: (형질 수, 3, 3, 3), fitness: (형질 수, 3)
+    assortative: 같은 유전자형끼리 짝짓는 비율 (0 = 무작위 교배, 1 = 완전 동류 교배)
+    """
+    selected = freqs * fitness
+    selected /= selected.sum(axis=-1, keepdims=True)
+
+    random_pairs = np.einsum('...ti,...tj->...tij', selected, selected)
+    same_pairs = selected[..., :, None] * np.eye(3)
+    pairs = (1 - assortative) * random_pairs + assortative * same_pairs
+    return np.einsum('...tij,tijk->...tk', pairs, tables)
+
+def simulate(traits, initial_freqs, population_size, generations,
+             selection=None, assortative=0.0, replicates=1,
+             record_every=1, seed=None):
+    """
+    라이트-피셔 시뮬레이션 실행
+
+    initial_freqs: (형질 수, 3) 유전자형 빈도 또는 개수
+                   (population.genotype_frequencies / accumulate_counts 결과)
+    반환: (기록 수, 반복 수, 형질 수, 3) 유전자형 빈도 기록. 0세대를 포함한다.
+    """
+    rng = np.random.default_rng(seed)
+    tables = offspring_tables(traits)
+    fitness = fitness_matrix(traits, selection)
+
+    initial = np.asarray(initial_freqs, dtype=np.float64)
+    initial = initial / initial.sum(axis=-1, keepdims=True)
+    freqs = np.broadcast_to(initial, (replicates,) + initial.shape).copy()
+
+    history = [freqs.copy()]
+    for generation in range(1, generations + 1):
+        probs = next_generation_probs(freqs, tables, fitness, assortative)
+        # 반올림 오차로 합이 1을 살짝 넘으면 multinomial이 거부하므로 정규화
+        probs /= probs.sum(axis=-1, keepdims=True)
+        counts = rng.multinomial(population_size, probs)
+        freqs = counts / population_size
+
+        if generation % record_every == 0:
+            history.append(freqs.copy())
+    return np.stack(history)